@@ -3,14 +3,27 @@
 Script to add missing Swift files to Xcode project
 """
 
-import re
+import argparse
+import fnmatch
+import json
+import os
+import posixpath
 import sys
 
-def add_files_to_project(project_file_path):
-    """Add missing Swift files to project.pbxproj"""
-    
-    with open(project_file_path, 'r') as f:
-        content = f.read()
+from instrumentation import add_profile_arguments, count, profiling, span
+from pbxproj import SKIPPED_DIRS, Transaction, find_projects, print_results, run_transactions
+
+# Directory holding the Xcode projects this script edits by default
+REPO_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Directory mtimes from the last --sync, so unchanged directories are not listed
+SYNC_CACHE = os.path.join(REPO_ROOT, ".pbxproj_sync_cache.json")
+
+# Swift files --sync never registers: standalone scripts and test sources
+SYNC_EXCLUDE = ["test_*.swift", "*Tests.swift"]
+
+def add_files_to_project(project_file_paths, dry_run=False):
+    """Add missing Swift files to each project.pbxproj in one transaction"""
     
     # Files to add
     files_to_add = [
@@ -52,65 +65,216 @@ def add_files_to_project(project_file_path):
         }
     ]
     
-    # Add PBXBuildFile entries
-    build_files_section = "/* Begin PBXBuildFile section */"
+    transaction = Transaction()
     for file_info in files_to_add:
-        build_file_entry = f"""
-		{file_info['build_id']} /* {file_info['name']} in Sources */ = {{isa = PBXBuildFile; fileRef = {file_info['id']} /* {file_info['name']} */; }};"""
-        content = content.replace(build_files_section, build_files_section + build_file_entry)
+        group_name = os.path.basename(os.path.dirname(file_info['path']))
+        transaction.add_file(file_info['name'], group_name, file_info['id'], file_info['build_id'])
     
-    # Add PBXFileReference entries
-    file_refs_section = "/* Begin PBXFileReference section */"
-    for file_info in files_to_add:
-        file_ref_entry = f"""
-		{file_info['id']} /* {file_info['name']} */ = {{isa = PBXFileReference; lastKnownFileType = sourcecode.swift; path = {file_info['name']}; sourceTree = \"<group>\"; }};"""
-        content = content.replace(file_refs_section, file_refs_section + file_ref_entry)
+    results = transaction.commit(project_file_paths, dry_run)
+    print_results(results)
     
-    # Add to Sources build phase
-    sources_build_phase = "/* Sources */ = {"
-    for file_info in files_to_add:
-        sources_entry = f"""
-				{file_info['build_id']} /* {file_info['name']} in Sources */,"""
-        content = content.replace(sources_build_phase, sources_build_phase + sources_entry)
+    changed = sum(1 for result in results if result.diff)
+    if dry_run:
+        print(f"SUCCESS: Dry run; {changed} project file(s) would change")
+    else:
+        print(f"SUCCESS: Added missing Swift files to {changed} project file(s)")
+    return True
+
+def load_sync_cache(path=SYNC_CACHE):
+    """Load the --sync directory cache, or an empty one"""
+    try:
+        with open(path, 'r') as f:
+            return json.load(f).get("projects", {})
+    except (OSError, ValueError):
+        return {}
+
+def save_sync_cache(projects, path=SYNC_CACHE):
+    """Write the --sync directory cache, replacing the old one atomically"""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump({"version": 1, "projects": projects}, f, indent=2, sort_keys=True)
+        f.write("\n")
+    os.replace(tmp_path, path)
+
+def file_stamp(path):
+    """Return [mtime_ns, size] identifying a version of a file"""
+    stat = os.stat(path)
+    return [stat.st_mtime_ns, stat.st_size]
+
+def scan_source_tree(root, source_dir, cached_dirs, full_scan, exclude):
+    """Walk root/source_dir, listing only directories whose mtime changed
+
+    A directory's mtime changes whenever an entry is added, removed or
+    renamed in it, so an unchanged directory holds the files seen last
+    time; its subdirectories come from the cache and its files are not
+    listed. Returns (dirs, candidates): the new cache of {dir: [mtime_ns,
+    subdirs]} and the Swift files found in listed directories, all as
+    paths relative to root.
+    """
+    dirs = {}
+    candidates = []
+    stack = [os.path.normpath(source_dir)]
+    while stack:
+        directory = stack.pop()
+        try:
+            mtime = os.stat(os.path.join(root, directory)).st_mtime_ns
+        except OSError:
+            continue
+        cached = cached_dirs.get(directory)
+        if not full_scan and cached and cached[0] == mtime:
+            dirs[directory] = cached
+            stack.extend(cached[1])
+            continue
+        
+        subdirs = []
+        count("directories listed")
+        with os.scandir(os.path.join(root, directory)) as entries:
+            for entry in entries:
+                path = os.path.join(directory, entry.name)
+                if entry.is_dir():
+                    # Bundles such as .xcassets and .mlpackage are files to Xcode
+                    if not entry.name.startswith(".") and "." not in entry.name and entry.name not in SKIPPED_DIRS:
+                        subdirs.append(path)
+                elif entry.name.endswith(".swift") and not any(fnmatch.fnmatch(entry.name, pattern)
+                                                               for pattern in exclude):
+                    candidates.append(path)
+        dirs[directory] = [mtime, sorted(subdirs)]
+        stack.extend(subdirs)
+    return dirs, candidates
+
+def ensure_group(project, groups, directory):
+    """Return the ID of the group for directory, creating any missing groups down to it"""
+    if directory in groups:
+        return groups[directory]
+    if directory in ("", "."):
+        return None
+    parent_id = ensure_group(project, groups, posixpath.dirname(directory) or ".")
+    if parent_id is None:
+        return None
+    name = posixpath.basename(directory)
+    group_id = project.new_id(f"PBXGroup:{directory}")
+    project.add_object(group_id, {"isa": "PBXGroup", "children": [], "path": name, "sourceTree": "<group>"}, name)
+    project.append_item(parent_id, "children", group_id)
+    groups[directory] = group_id
+    return group_id
+
+def register_missing_files(project, candidates):
+    """Add every candidate file (a path relative to the project root) the project does not reference
+
+    Files go into the group for their directory and the first target's
+    Sources phase, with IDs derived from their path so every project
+    assigns the same IDs to the same file.
+    """
+    paths = project.tree_paths()
+    groups = {}
+    referenced = set()
+    for object_id, path in paths.items():
+        obj = project.objects[object_id]
+        if obj.isa != "PBXGroup":
+            referenced.add(path)
+        elif obj.fields.get("path", ".") != "." or object_id == project.get(project.root_id).fields.get("mainGroup"):
+            groups.setdefault(path, object_id)
     
-    # Add to appropriate groups
-    # Add Models group
-    models_group = "/* Models */ = {"
-    for file_info in files_to_add:
-        if 'Models' in file_info['path']:
-            group_entry = f"""
-				{file_info['id']} /* {file_info['name']} */,"""
-            content = content.replace(models_group, models_group + group_entry)
+    phases = project.sources_phases()
+    if not phases:
+        return ["WARNING: Skipped sync: the project has no Sources build phase"]
     
-    # Add Coordinators group  
-    coordinators_group = "/* Coordinators */ = {"
-    for file_info in files_to_add:
-        if 'Coordinators' in file_info['path']:
-            group_entry = f"""
-				{file_info['id']} /* {file_info['name']} */,"""
-            content = content.replace(coordinators_group, coordinators_group + group_entry)
+    messages = []
+    for candidate in sorted(candidates):
+        path = posixpath.normpath(candidate.replace(os.sep, "/"))
+        if path in referenced:
+            continue
+        group_id = ensure_group(project, groups, posixpath.dirname(path))
+        if group_id is None:
+            messages.append(f"WARNING: Skipped {path}: it is outside the project's groups")
+            continue
+        
+        name = posixpath.basename(path)
+        file_id = project.new_id(f"PBXFileReference:{path}")
+        project.add_object(file_id, {
+            "isa": "PBXFileReference",
+            "lastKnownFileType": "sourcecode.swift",
+            "path": name,
+            "sourceTree": "<group>",
+        }, name)
+        build_id = project.new_id(f"PBXBuildFile:{path}")
+        project.add_object(build_id, {"isa": "PBXBuildFile", "fileRef": file_id}, f"{name} in Sources")
+        project.append_item(group_id, "children", file_id)
+        for phase_id in phases:
+            project.append_item(phase_id, "files", build_id)
+        referenced.add(path)
+        messages.append(f"Added: {path}")
+    return messages
+
+def sync_projects(project_file_paths, source_dir="VividAI", exclude=SYNC_EXCLUDE, dry_run=False,
+                  cache_path=SYNC_CACHE, parse_cache_dir=None, workers=None):
+    """Register every Swift file under source_dir that a project does not reference yet
+
+    source_dir is relative to the directory holding each .xcodeproj.
+    Projects whose file and source directories are unchanged since the
+    last sync are skipped without being parsed. Returns the ProjectResults
+    of the projects that were checked.
+    """
+    cache = load_sync_cache(cache_path)
+    # The directory cache only holds for the tree and exclusions it was built from
+    scan = [os.path.normpath(source_dir), sorted(exclude)]
+    jobs = []
+    for path in project_file_paths:
+        key = os.path.abspath(path)
+        root = os.path.dirname(os.path.dirname(key))
+        entry = cache.get(key, {})
+        stamp = file_stamp(path)
+        unchanged = entry.get("project") == stamp and entry.get("scan") == scan
+        with span("scan source tree", project=path):
+            dirs, candidates = scan_source_tree(root, source_dir, entry.get("dirs", {}), not unchanged, exclude)
+        if not candidates and unchanged:
+            print(f"{path}:\n  Up to date")
+            cache[key] = {"project": stamp, "scan": scan, "dirs": dirs}
+            continue
+        jobs.append((path, key, dirs, candidates))
     
-    # Add Views group
-    views_group = "/* Views */ = {"
-    for file_info in files_to_add:
-        if 'Views' in file_info['path']:
-            group_entry = f"""
-				{file_info['id']} /* {file_info['name']} */,"""
-            content = content.replace(views_group, views_group + group_entry)
+    results = run_transactions([(Transaction(parse_cache_dir).queue(register_missing_files, candidates), path)
+                                for path, _, _, candidates in jobs], dry_run, workers)
+    print_results(results)
     
-    # Write the modified content back
-    with open(project_file_path, 'w') as f:
-        f.write(content)
+    if not dry_run:
+        for path, key, dirs, _ in jobs:
+            cache[key] = {"project": file_stamp(path), "scan": scan, "dirs": dirs}
+        save_sync_cache(cache, cache_path)
     
-    print("SUCCESS: Added missing Swift files to project.pbxproj")
-    return True
+    added = sum(1 for result in results for message in result.messages if message.startswith("Added"))
+    verb = "would be registered" if dry_run else "registered"
+    print(f"SUCCESS: Sync checked {len(project_file_paths)} project file(s); {added} file(s) {verb}")
+    return results
 
-if __name__ == "__main__":
-    project_file = "VividAI.xcodeproj/project.pbxproj"
-    try:
-        add_files_to_project(project_file)
-        print("SUCCESS: Project files updated successfully!")
-    except Exception as e:
-        print(f"ERROR: Error updating project files: {e}")
-        sys.exit(1)
+def parse_args(argv=None):
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Add missing Swift files to the VividAI Xcode projects")
+    parser.add_argument("--project", action="append", metavar="PBXPROJ",
+                        help="project.pbxproj to edit; repeatable (default: every project in the repo)")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="print a unified diff of the changes instead of writing them")
+    parser.add_argument("--sync", action="store_true",
+                        help="register every Swift file under --source-dir that is missing from the project, "
+                             "skipping directories unchanged since the last sync")
+    parser.add_argument("--source-dir", default="VividAI",
+                        help="directory --sync walks, relative to each .xcodeproj's folder (default: VividAI)")
+    parser.add_argument("--exclude", action="append", metavar="GLOB",
+                        help="file name pattern --sync skips; repeatable (default: test_*.swift, *Tests.swift)")
+    add_profile_arguments(parser)
+    return parser.parse_args(argv)
 
+if __name__ == "__main__":
+    args = parse_args()
+    with profiling(args.profile, args.cprofile):
+        try:
+            projects = args.project or find_projects(REPO_ROOT)
+            if args.sync:
+                sync_projects(projects, args.source_dir, args.exclude or SYNC_EXCLUDE, args.dry_run)
+            else:
+                add_files_to_project(projects, args.dry_run)
+            if not args.dry_run:
+                print("SUCCESS: Project files updated successfully!")
+        except Exception as e:
+            print(f"ERROR: Error updating project files: {e}")
+            sys.exit(1)
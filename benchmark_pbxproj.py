@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+Xcode Project Editing Benchmarks
+Generates synthetic project.pbxproj files with thousands of file references,
+times the project editing operations on them and compares the results
+against a stored JSON baseline
+"""
+
+import argparse
+import platform
+import sys
+import time
+
+import pbxproj
+from benchmarking import check_baseline, measure_allocations, median_timings, peak_rss_kb, write_results
+from add_files_to_project import register_missing_files
+from pbxproj import PBXProject, add_source_file, remove_file, remove_package, verify_project
+
+# Timed operations; every edit includes serializing the edited project
+OPERATIONS = ("parse", "serialize", "add", "remove", "remove_package", "sync")
+
+# File reference counts benchmarked by default
+DEFAULT_SIZES = (1000, 10000, 50000)
+
+# Files per synthetic module group
+FILES_PER_GROUP = 100
+
+# Every Nth synthetic file is a resource instead of a Swift source
+RESOURCE_EVERY = 20
+
+# Name of the synthetic Swift package timed by remove_package
+PACKAGE = "bench-package"
+
+def object_id(kind, number):
+    """Return a deterministic 24 digit object ID; kind keeps object types apart"""
+    return f"B{kind:03X}{number:020X}"
+
+def reference(object_id_, comment):
+    """Render an object reference with its comment"""
+    return f"{object_id_} /* {comment} */"
+
+def block(object_id_, comment, fields):
+    """Render a multi-line object; fields are (key, value) pairs, lists render as arrays"""
+    lines = [f"\t\t{reference(object_id_, comment) if comment else object_id_} = {{"]
+    for key, value in fields:
+        if isinstance(value, list):
+            lines.append(f"\t\t\t{key} = (")
+            lines.extend(f"\t\t\t\t{item}," for item in value)
+            lines.append("\t\t\t);")
+        else:
+            lines.append(f"\t\t\t{key} = {value};")
+    lines.append("\t\t};")
+    return "\n".join(lines) + "\n"
+
+def section(isa, body):
+    """Render an object section"""
+    return f"\n/* Begin {isa} section */\n{body}/* End {isa} section */\n"
+
+def synthetic_project(file_count, files_per_group=FILES_PER_GROUP):
+    """Return (text, paths) for a one-target project with file_count file references
+
+    Files are spread over App/ModuleNNNN groups. paths lists every file's
+    path relative to the project root, as a sync scan would find them.
+    """
+    main_group, products_group, app_group = object_id(1, 0), object_id(1, 1), object_id(1, 2)
+    product = object_id(2, 0)
+    target, project = object_id(3, 0), object_id(3, 1)
+    sources, frameworks, resources = object_id(4, 0), object_id(4, 1), object_id(4, 2)
+    target_config, project_config = object_id(5, 0), object_id(5, 1)
+    target_list, project_list = object_id(5, 2), object_id(5, 3)
+    package, package_product, package_build = object_id(6, 0), object_id(6, 1), object_id(6, 2)
+
+    build_lines, reference_lines, paths = [], [], []
+    source_files, resource_files, modules = [], [], []
+    for number in range(file_count):
+        module = number // files_per_group
+        if number % files_per_group == 0:
+            modules.append((object_id(7, module), f"Module{module:04d}", []))
+        is_resource = number % RESOURCE_EVERY == RESOURCE_EVERY - 1
+        name = f"Resource{number:06d}.json" if is_resource else f"File{number:06d}.swift"
+        phase = "Resources" if is_resource else "Sources"
+        file_type = "text.json" if is_resource else "sourcecode.swift"
+        file_id, build_id = object_id(8, number), object_id(9, number)
+        build_lines.append(f"\t\t{reference(build_id, f'{name} in {phase}')} = "
+                           f"{{isa = PBXBuildFile; fileRef = {reference(file_id, name)}; }};\n")
+        reference_lines.append(f"\t\t{reference(file_id, name)} = {{isa = PBXFileReference; "
+                               f"lastKnownFileType = {file_type}; path = {name}; sourceTree = \"<group>\"; }};\n")
+        (resource_files if is_resource else source_files).append(reference(build_id, f"{name} in {phase}"))
+        modules[-1][2].append(reference(file_id, name))
+        paths.append(f"App/{modules[-1][1]}/{name}")
+
+    build_lines.append(f"\t\t{reference(package_build, 'BenchKit in Frameworks')} = "
+                       f"{{isa = PBXBuildFile; productRef = {reference(package_product, 'BenchKit')}; }};\n")
+    reference_lines.append(f"\t\t{reference(product, 'App.app')} = {{isa = PBXFileReference; "
+                           "explicitFileType = wrapper.application; includeInIndex = 0; path = App.app; "
+                           "sourceTree = BUILT_PRODUCTS_DIR; };\n")
+
+    groups = block(main_group, None, [("isa", "PBXGroup"),
+                                      ("children", [reference(app_group, "App"),
+                                                    reference(products_group, "Products")]),
+                                      ("sourceTree", '"<group>"')])
+    groups += block(products_group, "Products", [("isa", "PBXGroup"), ("children", [reference(product, "App.app")]),
+                                                 ("name", "Products"), ("sourceTree", '"<group>"')])
+    groups += block(app_group, "App", [("isa", "PBXGroup"),
+                                       ("children", [reference(group_id, name) for group_id, name, _ in modules]),
+                                       ("path", "App"), ("sourceTree", '"<group>"')])
+    for group_id, name, children in modules:
+        groups += block(group_id, name, [("isa", "PBXGroup"), ("children", children),
+                                         ("path", name), ("sourceTree", '"<group>"')])
+
+    def phase(phase_id, isa, comment, files):
+        return section(isa, block(phase_id, comment, [("isa", isa), ("buildActionMask", "2147483647"),
+                                                      ("files", files),
+                                                      ("runOnlyForDeploymentPostprocessing", "0")]))
+
+    def configuration(config_id, settings):
+        return block(config_id, "Debug", [("isa", "XCBuildConfiguration"),
+                                          ("buildSettings", "{\n" + "".join(f"\t\t\t\t{key} = {value};\n"
+                                                                            for key, value in settings) + "\t\t\t}"),
+                                          ("name", "Debug")])
+
+    def configuration_list(list_id, owner, config_id):
+        return block(list_id, f'Build configuration list for {owner} "App"',
+                     [("isa", "XCConfigurationList"), ("buildConfigurations", [reference(config_id, "Debug")]),
+                      ("defaultConfigurationIsVisible", "0"), ("defaultConfigurationName", "Debug")])
+
+    text = "// !$*UTF8*$!\n{\n\tarchiveVersion = 1;\n\tclasses = {\n\t};\n\tobjectVersion = 56;\n\tobjects = {\n"
+    text += section("PBXBuildFile", "".join(build_lines))
+    text += section("PBXFileReference", "".join(reference_lines))
+    text += phase(frameworks, "PBXFrameworksBuildPhase", "Frameworks", [reference(package_build, "BenchKit in Frameworks")])
+    text += section("PBXGroup", groups)
+    text += section("PBXNativeTarget", block(target, "App", [
+        ("isa", "PBXNativeTarget"),
+        ("buildConfigurationList", reference(target_list, 'Build configuration list for PBXNativeTarget "App"')),
+        ("buildPhases", [reference(sources, "Sources"), reference(frameworks, "Frameworks"),
+                         reference(resources, "Resources")]),
+        ("buildRules", []), ("dependencies", []), ("name", "App"),
+        ("packageProductDependencies", [reference(package_product, "BenchKit")]),
+        ("productName", "App"), ("productReference", reference(product, "App.app")),
+        ("productType", '"com.apple.product-type.application"'),
+    ]))
+    text += section("PBXProject", block(project, "Project object", [
+        ("isa", "PBXProject"),
+        ("buildConfigurationList", reference(project_list, 'Build configuration list for PBXProject "App"')),
+        ("compatibilityVersion", '"Xcode 14.0"'), ("developmentRegion", "en"), ("hasScannedForEncodings", "0"),
+        ("knownRegions", ["en", "Base"]), ("mainGroup", main_group),
+        ("packageReferences", [reference(package, f'XCRemoteSwiftPackageReference "{PACKAGE}"')]),
+        ("productRefGroup", reference(products_group, "Products")),
+        ("projectDirPath", '""'), ("projectRoot", '""'), ("targets", [reference(target, "App")]),
+    ]))
+    text += phase(resources, "PBXResourcesBuildPhase", "Resources", resource_files)
+    text += phase(sources, "PBXSourcesBuildPhase", "Sources", source_files)
+    text += section("XCBuildConfiguration",
+                    configuration(project_config, [("SWIFT_VERSION", "5.0")]) +
+                    configuration(target_config, [("PRODUCT_NAME", '"$(TARGET_NAME)"')]))
+    text += section("XCConfigurationList",
+                    configuration_list(target_list, "PBXNativeTarget", target_config) +
+                    configuration_list(project_list, "PBXProject", project_config))
+    text += section("XCRemoteSwiftPackageReference", block(package, f'XCRemoteSwiftPackageReference "{PACKAGE}"', [
+        ("isa", "XCRemoteSwiftPackageReference"), ("repositoryURL", f'"https://github.com/example/{PACKAGE}"'),
+        ("requirement", "{\n\t\t\t\tkind = upToNextMajorVersion;\n\t\t\t\tminimumVersion = 1.0.0;\n\t\t\t}"),
+    ]))
+    text += section("XCSwiftPackageProductDependency", block(package_product, "BenchKit", [
+        ("isa", "XCSwiftPackageProductDependency"),
+        ("package", reference(package, f'XCRemoteSwiftPackageReference "{PACKAGE}"')),
+        ("productName", "BenchKit"),
+    ]))
+    text += f"\t}};\n\trootObject = {reference(project, 'Project object')};\n}}\n"
+    return text, paths
+
+def sync_candidates(paths):
+    """Return a sync scan result: every existing file plus 1% new ones, half in a new module"""
+    new_count = max(10, len(paths) // 100)
+    new_paths = [f"App/Module0000/Added{number:06d}.swift" for number in range(new_count // 2)]
+    new_paths += [f"App/NewModule/Added{number:06d}.swift" for number in range(new_count - new_count // 2)]
+    return paths + new_paths
+
+def run_operations(text, paths):
+    """Run every operation once on fresh parses of text; return per-operation seconds"""
+    timings = {}
+    middle = paths[len(paths) // 2].rsplit("/", 1)[-1]
+    candidates = sync_candidates(paths)
+    edits = {
+        "add": lambda project: add_source_file(project, "BenchAdded.swift", "Module0000",
+                                               object_id(10, 0), object_id(10, 1)),
+        "remove": lambda project: remove_file(project, middle),
+        "remove_package": lambda project: remove_package(project, PACKAGE),
+        "sync": lambda project: register_missing_files(project, candidates),
+    }
+
+    start = time.perf_counter()
+    project = PBXProject(text)
+    timings["parse"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    project.serialize()
+    timings["serialize"] = time.perf_counter() - start
+
+    for operation, edit in edits.items():
+        project = PBXProject(text)
+        start = time.perf_counter()
+        edit(project)
+        project.serialize()
+        timings[operation] = time.perf_counter() - start
+    return timings
+
+def check_synthetic(text):
+    """Fail loudly if a synthetic project does not round-trip or verify cleanly"""
+    project = PBXProject(text)
+    if project.serialize() != text:
+        raise ValueError("synthetic project does not round-trip through the parser")
+    problems = verify_project(project)
+    if problems:
+        raise ValueError(f"synthetic project is inconsistent: {problems[0]}")
+
+def benchmark_case(file_count, repeat):
+    """Benchmark one project size and return its result record
+
+    The synthetic project is checked before timing, so a generator bug
+    cannot masquerade as a speedup.
+    """
+    text, paths = synthetic_project(file_count)
+    check_synthetic(text)
+
+    record = median_timings(run_operations, OPERATIONS, repeat, text, paths)
+    record["project_bytes"] = len(text.encode("utf-8"))
+    record["alloc_peak_bytes"] = measure_allocations(run_operations, text, paths)
+    record["peak_rss_kb"] = peak_rss_kb()
+    return record
+
+def run_benchmarks(sizes, repeat):
+    """Benchmark every project size and return the results document"""
+    results = {}
+    for file_count in sizes:
+        record = benchmark_case(file_count, repeat)
+        results[f"files@{file_count}"] = record
+        print(f"  {file_count:>6} files  parse {record['parse_ms']:8.2f}  add {record['add_ms']:7.2f}  "
+              f"remove {record['remove_ms']:7.2f}  package {record['remove_package_ms']:7.2f}  "
+              f"sync {record['sync_ms']:8.2f}  alloc {record['alloc_peak_bytes'] / 2**20:7.1f} MiB")
+
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cache_version": pbxproj.CACHE_VERSION,
+            "sizes": list(sizes),
+            "repeat": repeat,
+            "peak_rss_kb": peak_rss_kb(),
+        },
+        "results": results,
+    }
+
+def parse_args(argv=None):
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Benchmark project.pbxproj editing on synthetic projects")
+    parser.add_argument("--sizes", type=lambda value: [int(size) for size in value.split(",")],
+                        default=list(DEFAULT_SIZES),
+                        help="comma separated file reference counts (default: 1000,10000,50000)")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="timed runs per case; the median is reported (default: 3)")
+    parser.add_argument("--output", default="pbxproj_benchmark.json",
+                        help="where to write the JSON results (default: pbxproj_benchmark.json)")
+    parser.add_argument("--write-project", metavar="PATH",
+                        help="also write the largest synthetic project.pbxproj here for manual testing")
+    parser.add_argument("--baseline",
+                        help="JSON results from an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="allowed slowdown against the baseline as a fraction (default: 0.2)")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0,
+                        help="ignore slowdowns smaller than this many milliseconds (default: 1.0)")
+    parser.add_argument("--alloc-threshold", type=float, default=0.1,
+                        help="allowed growth in peak allocations as a fraction (default: 0.1)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    """Run the benchmarks and optionally check them against a baseline"""
+    args = parse_args(argv)
+    if not args.sizes or min(args.sizes) < 1:
+        print("ERROR: Sizes must be positive file counts")
+        sys.exit(2)
+
+    print("Benchmarking project.pbxproj editing...")
+    results = run_benchmarks(args.sizes, args.repeat)
+
+    write_results(args.output, results)
+
+    if args.write_project:
+        with open(args.write_project, 'w') as f:
+            f.write(synthetic_project(max(args.sizes))[0])
+        print(f"Synthetic project written to {args.write_project}")
+
+    if args.baseline:
+        check_baseline(results, args.baseline, [f"{operation}_ms" for operation in OPERATIONS],
+                       args.threshold, args.min_delta_ms, args.alloc_threshold)
+
+if __name__ == "__main__":
+    main()
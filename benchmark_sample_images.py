@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Sample Image Generator Benchmarks
+Times every style branch of generate_sample_images.py stage by stage and
+compares the results against a stored JSON baseline
+"""
+
+import argparse
+import platform
+import sys
+import time
+
+import numpy as np
+import PIL
+from PIL import ImageDraw
+
+import generate_sample_images as generator
+from benchmarking import check_baseline, measure_allocations, median_timings, peak_rss_kb, write_results
+
+# Timed stages, in the order create_sample_image runs them
+STAGES = ("draw", "text", "encode")
+
+# Canvas sizes (points at scale 1) benchmarked by default
+DEFAULT_SIZES = (360, 1080, 2048)
+
+# Tile sizes and scales --check-tiles compares against whole renders; odd
+# sizes put tile edges on caption and texture boundaries
+CHECK_TILE_SIZES = (64, 100, 333, 512)
+CHECK_SCALES = (1, 2, 3)
+
+def run_stages(style_key, style_info, size):
+    """Run one style through draw, text layout and encode; return per-stage seconds"""
+    timings = {}
+    seed = generator.style_seed(style_key)
+
+    start = time.perf_counter()
+    img, textured = generator.render_background(style_key, style_info, size, seed, 1, {})
+    timings["draw"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    layout = generator.layout_caption(style_info, size, 1)
+    generator.draw_caption(ImageDraw.Draw(img), style_info, layout, 1, textured)
+    timings["text"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    generator.encode_image(img, generator.ENCODER_SETTINGS)
+    timings["encode"] = time.perf_counter() - start
+    return timings
+
+def check_tiles(style_key, style_info, size, scale, tile_sizes=CHECK_TILE_SIZES):
+    """Return (tile size, differing pixels, largest difference) for every tiled render that differs
+
+    The tiled renderer must reproduce create_sample_image exactly.
+    """
+    whole = np.asarray(generator.create_sample_image(style_key, style_info, size, None, scale))
+    mismatches = []
+    for tile_size in tile_sizes:
+        tiled = np.empty_like(whole)
+        for region, pixels in generator.render_tiles(style_key, style_info, size, scale, tile_size):
+            tiled[region.top:region.top + region.height, region.left:region.left + region.width] = pixels
+        difference = np.abs(whole.astype(np.int16) - tiled).max(axis=2)
+        if difference.any():
+            mismatches.append((tile_size, int(np.count_nonzero(difference)), int(difference.max())))
+    return mismatches
+
+def benchmark_case(style_key, style_info, size, repeat):
+    """Benchmark one style at one size and return its result record
+
+    total_ms is the sum of the stage medians, not the median of the totals.
+    """
+    record = median_timings(run_stages, STAGES, repeat, style_key, style_info, (size, size))
+    record["total_ms"] = round(sum(record[f"{stage}_ms"] for stage in STAGES), 3)
+    record["alloc_peak_bytes"] = measure_allocations(run_stages, style_key, style_info, (size, size))
+    record["peak_rss_kb"] = peak_rss_kb()
+    return record
+
+def run_benchmarks(styles, sizes, repeat):
+    """Benchmark every style at every size and return the results document"""
+    # Always measure the built-in font so results compare across machines
+    generator.FONT_FILE = None
+    generator.load_fonts.cache_clear()
+
+    results = {}
+    for size in sizes:
+        for style_key in styles:
+            record = benchmark_case(style_key, generator.STYLES[style_key], size, repeat)
+            results[f"{style_key}@{size}"] = record
+            print(f"  {style_key:<24} {size:>5}  draw {record['draw_ms']:8.2f}  text {record['text_ms']:7.2f}  "
+                  f"encode {record['encode_ms']:8.2f}  alloc {record['alloc_peak_bytes'] / 2**20:7.1f} MiB")
+
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "pillow": PIL.__version__,
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "generator_version": generator.GENERATOR_VERSION,
+            "sizes": list(sizes),
+            "repeat": repeat,
+            "peak_rss_kb": peak_rss_kb(),
+        },
+        "results": results,
+    }
+
+def parse_args(argv=None):
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Benchmark the VividAI sample image generator")
+    parser.add_argument("--sizes", type=lambda value: [int(size) for size in value.split(",")],
+                        default=list(DEFAULT_SIZES),
+                        help="comma separated canvas sizes (default: 360,1080,2048)")
+    parser.add_argument("--styles", type=lambda value: value.split(","),
+                        default=list(generator.STYLES),
+                        help="comma separated style keys (default: all)")
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="timed runs per case; the median is reported (default: 5)")
+    parser.add_argument("--output", default="sample_images_benchmark.json",
+                        help="where to write the JSON results (default: sample_images_benchmark.json)")
+    parser.add_argument("--baseline",
+                        help="JSON results from an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="allowed slowdown against the baseline as a fraction (default: 0.2)")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0,
+                        help="ignore slowdowns smaller than this many milliseconds (default: 1.0)")
+    parser.add_argument("--check-tiles", action="store_true",
+                        help="instead of timing, check that tiled renders match whole renders "
+                             "at the first size, every scale and several tile sizes")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    """Run the benchmarks and optionally check them against a baseline"""
+    args = parse_args(argv)
+    unknown = [style_key for style_key in args.styles if style_key not in generator.STYLES]
+    if unknown:
+        print(f"ERROR: Unknown style(s): {', '.join(unknown)}")
+        sys.exit(2)
+
+    if args.check_tiles:
+        print("Comparing tiled renders with whole renders...")
+        failures = 0
+        for scale in CHECK_SCALES:
+            for style_key in args.styles:
+                size = (args.sizes[0], args.sizes[0])
+                for tile_size, pixels, largest in check_tiles(style_key, generator.STYLES[style_key], size, scale):
+                    print(f"  {style_key:<24} @{scale}x  tile {tile_size:>4}: {pixels} pixel(s) differ by up to {largest}")
+                    failures += 1
+        if failures:
+            print(f"ERROR: {failures} tiled render(s) differ from the whole image")
+            sys.exit(1)
+        print(f"SUCCESS: Tiled renders match for tile sizes {', '.join(map(str, CHECK_TILE_SIZES))}")
+        return
+
+    print("Benchmarking sample image generation...")
+    results = run_benchmarks(args.styles, args.sizes, args.repeat)
+
+    write_results(args.output, results)
+    if args.baseline:
+        check_baseline(results, args.baseline, [f"{stage}_ms" for stage in STAGES] + ["total_ms"],
+                       args.threshold, args.min_delta_ms)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Benchmark Helpers
+Timing, memory and baseline comparison shared by benchmark_sample_images.py
+and benchmark_pbxproj.py
+"""
+
+import json
+import resource
+import statistics
+import sys
+import tracemalloc
+
+def median_timings(run, names, repeat, *args):
+    """Call run(*args) repeat times; return {"<name>_ms": median} for the seconds it reports
+
+    run returns a dict of seconds keyed by every name in names.
+    """
+    samples = {name: [] for name in names}
+    for _ in range(repeat):
+        for name, seconds in run(*args).items():
+            samples[name].append(seconds * 1000)
+    return {f"{name}_ms": round(statistics.median(samples[name]), 3) for name in names}
+
+def measure_allocations(run, *args):
+    """Return the peak bytes traced by tracemalloc across one call of run(*args)
+
+    Run separately from the timed calls because tracemalloc slows
+    everything down.
+    """
+    tracemalloc.start()
+    try:
+        run(*args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+def peak_rss_kb():
+    """Return the process's peak resident set size in KiB
+
+    This is the high-water mark so far, so it only grows across a run.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS and KiB on Linux
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+def write_results(path, results):
+    """Write a results document as JSON and print where it went"""
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+        f.write("\n")
+    print(f"\nResults written to {path}")
+    print(f"Peak RSS: {results['meta']['peak_rss_kb'] / 1024:.1f} MiB")
+
+def compare(results, baseline, metrics, threshold, min_delta_ms, alloc_threshold=None):
+    """Return (case, metric, baseline, current) for every measurement that regressed
+
+    A timing in metrics regresses when it exceeds the baseline by more than
+    threshold (a fraction) and by more than min_delta_ms, so sub-millisecond
+    noise on tiny cases is not reported. With alloc_threshold, peak
+    allocations regress when they grow by more than that fraction.
+    """
+    regressions = []
+    for case, record in results["results"].items():
+        previous = baseline.get("results", {}).get(case)
+        if previous is None:
+            continue
+        for metric in metrics:
+            if metric not in previous:
+                continue
+            current, before = record[metric], previous[metric]
+            if current > before * (1 + threshold) and current - before > min_delta_ms:
+                regressions.append((case, metric, before, current))
+        before = previous.get("alloc_peak_bytes")
+        if alloc_threshold is not None and before and record["alloc_peak_bytes"] > before * (1 + alloc_threshold):
+            regressions.append((case, "alloc_peak_bytes", before, record["alloc_peak_bytes"]))
+    return regressions
+
+def check_baseline(results, path, metrics, threshold, min_delta_ms, alloc_threshold=None):
+    """Compare results against the baseline JSON at path; exits 1 on regressions"""
+    with open(path, 'r') as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, metrics, threshold, min_delta_ms, alloc_threshold)
+    if not regressions:
+        print(f"SUCCESS: No regressions beyond {threshold:.0%} against {path}")
+        return
+
+    print(f"ERROR: {len(regressions)} regression(s) against {path}:")
+    width = max(len(case) for case, _, _, _ in regressions)
+    for case, metric, before, current in regressions:
+        change = f" (+{current / before - 1:.0%})" if before else ""
+        unit = "bytes" if metric == "alloc_peak_bytes" else "ms"
+        print(f"  {case:<{width}} {metric:<18} {before:12.2f} -> {current:12.2f} {unit}{change}")
+    sys.exit(1)
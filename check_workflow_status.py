@@ -5,91 +5,332 @@ GitHub Actions Workflow Status Checker
 Checks the status of recent workflows for the VividAI repository
 """
 
-import requests
-import json
+import argparse
+import os
+import sys
+import tempfile
 import time
 from datetime import datetime
 
-def check_workflow_status():
+from github_actions import API_URL, ETAG_CACHE, REPOSITORY, ActionsClient, GitHubError
+from instrumentation import add_profile_arguments, profiling
+from workflow_history import HISTORY_DB, open_history, report, update_history
+from workflow_logs import print_matches, search_logs
+from workflow_timings import (DEFAULT_WORKERS, IOS_WORKFLOWS, fetch_jobs, print_run_timings, print_summary,
+                              select_runs, summarize)
+
+# Run statuses that mean the run has not finished yet
+ACTIVE_STATUSES = ("queued", "in_progress", "waiting", "requested", "pending")
+
+# Conclusions that count as a watched run passing
+PASSING_CONCLUSIONS = ("success", "neutral", "skipped")
+
+# Exit status of --watch when --timeout expires first, as timeout(1) uses
+WATCH_TIMEOUT_STATUS = 124
+
+def format_time(timestamp):
+    """Format an API timestamp for display"""
+    try:
+        dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+        return dt.strftime('%Y-%m-%d %H:%M:%S UTC')
+    except (AttributeError, ValueError):
+        return timestamp
+
+def status_label(status, conclusion):
+    """Return the bracketed label shown for a run's status and conclusion"""
+    if conclusion == 'success':
+        return "[SUCCESS]"
+    elif conclusion == 'failure':
+        return "[FAILED]"
+    elif conclusion == 'cancelled':
+        return "[CANCELLED]"
+    elif status == 'in_progress':
+        return "[RUNNING]"
+    return "[UNKNOWN]"
+
+def check_workflow_status(client=None, limit=5, branch=None):
     """Check the status of recent GitHub Actions workflows"""
     
-    # GitHub API endpoint for workflow runs
-    url = "https://api.github.com/repos/polashchandradas/VividAI/actions/runs"
-    
-    headers = {
-        "Accept": "application/vnd.github.v3+json",
-        "User-Agent": "VividAI-Workflow-Checker"
-    }
+    own_client = client is None
+    if own_client:
+        client = ActionsClient(token=os.environ.get("GITHUB_TOKEN"))
     
     try:
         print("Checking GitHub Actions workflow status...")
         print("=" * 60)
         
-        response = requests.get(url, headers=headers)
+        filters = {"branch": branch} if branch else {}
+        workflows, total = client.list_runs(limit, **filters)
         
-        if response.status_code == 200:
-            data = response.json()
-            workflows = data.get('workflow_runs', [])
-            
-            if not workflows:
-                print("No workflow runs found")
-                return
+        if not workflows:
+            print("No workflow runs found")
+            return
+        
+        print(f"Found {total} recent workflow runs")
+        print()
+        
+        for i, workflow in enumerate(workflows):
+            workflow_name = workflow.get('name', 'Unknown')
+            status = workflow.get('status', 'Unknown')
+            conclusion = workflow.get('conclusion', 'Unknown')
+            created_at = workflow.get('created_at', 'Unknown')
+            html_url = workflow.get('html_url', '')
             
-            print(f"Found {len(workflows)} recent workflow runs")
+            print(f"{status_label(status, conclusion)} Workflow #{i+1}: {workflow_name}")
+            print(f"   Status: {status}")
+            print(f"   Conclusion: {conclusion}")
+            print(f"   Created: {format_time(created_at)}")
+            print(f"   URL: {html_url}")
             print()
             
-            # Show last 5 workflows
-            for i, workflow in enumerate(workflows[:5]):
-                workflow_name = workflow.get('name', 'Unknown')
-                status = workflow.get('status', 'Unknown')
-                conclusion = workflow.get('conclusion', 'Unknown')
-                created_at = workflow.get('created_at', 'Unknown')
-                html_url = workflow.get('html_url', '')
-                
-                # Parse timestamp
-                try:
-                    dt = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
-                    time_str = dt.strftime('%Y-%m-%d %H:%M:%S UTC')
-                except:
-                    time_str = created_at
-                
-                # Status emoji
+            # Check if this is the most recent workflow
+            if i == 0:
                 if conclusion == 'success':
-                    status_emoji = "[SUCCESS]"
+                    print("Latest workflow completed successfully!")
                 elif conclusion == 'failure':
-                    status_emoji = "[FAILED]"
-                elif conclusion == 'cancelled':
-                    status_emoji = "[CANCELLED]"
+                    print("Latest workflow failed - check the logs for details")
+                    print(f"   Search them with: --logs {workflow.get('id')}")
                 elif status == 'in_progress':
-                    status_emoji = "[RUNNING]"
+                    print("Latest workflow is still running...")
                 else:
-                    status_emoji = "[UNKNOWN]"
-                
-                print(f"{status_emoji} Workflow #{i+1}: {workflow_name}")
-                print(f"   Status: {status}")
-                print(f"   Conclusion: {conclusion}")
-                print(f"   Created: {time_str}")
-                print(f"   URL: {html_url}")
+                    print(f"Latest workflow status: {status} ({conclusion})")
                 print()
-                
-                # Check if this is the most recent workflow
-                if i == 0:
-                    if conclusion == 'success':
-                        print("Latest workflow completed successfully!")
-                    elif conclusion == 'failure':
-                        print("Latest workflow failed - check the logs for details")
-                    elif status == 'in_progress':
-                        print("Latest workflow is still running...")
-                    else:
-                        print(f"Latest workflow status: {status} ({conclusion})")
-                    print()
-            
-        else:
-            print(f"Failed to fetch workflow data: {response.status_code}")
-            print(f"Response: {response.text}")
-            
+        
+        stats = client.stats
+        print(f"API requests: {stats['requests']} ({stats['not_modified']} not modified)")
+        
+    except GitHubError as e:
+        print(f"Failed to fetch workflow data: {e}")
     except Exception as e:
         print(f"Error checking workflow status: {e}")
+    finally:
+        if own_client:
+            client.close()
+
+def print_change(run):
+    """Print one line for a run whose status or conclusion changed"""
+    status, conclusion = run.get('status'), run.get('conclusion')
+    state = f"{status} ({conclusion})" if conclusion else status
+    print(f"{datetime.now().strftime('%H:%M:%S')} {status_label(status, conclusion)} "
+          f"{run.get('name', 'Unknown')} #{run.get('run_number', run['id'])}: {state}")
+
+def watch_workflows(client, limit=20, branch=None, interval=10, max_interval=300, timeout=None,
+                    sleep=time.sleep, clock=time.monotonic):
+    """Poll until every active run (or, if none, the next one to start) finishes
+
+    Polls every interval seconds while runs are active and doubles the wait
+    up to max_interval while idle; unchanged polls are answered with 304s
+    from the ETag cache. Watched runs that fall out of the newest limit runs
+    are fetched by ID. Only runs whose status or conclusion changed are
+    printed. Returns 0 if every watched run passed, 1 if any did not, or
+    WATCH_TIMEOUT_STATUS when timeout seconds pass first.
+    """
+    filters = {"branch": branch} if branch else {}
+    deadline = clock() + timeout if timeout else None
+    states = {}
+    watched = {}
+    wait = interval
+    first = True
+    while True:
+        runs, _ = client.list_runs(limit, **filters)
+        # Newer runs can push a watched one out of the listing; fetch it directly
+        listed = {run['id'] for run in runs}
+        runs += [client.get_run(run_id) for run_id, run in watched.items()
+                 if run_id not in listed and run.get('status') != 'completed']
+        for run in reversed(runs):
+            state = (run.get('status'), run.get('conclusion'))
+            active = state[0] in ACTIVE_STATUSES
+            if active or run['id'] in watched:
+                watched[run['id']] = run
+            if states.get(run['id']) != state and (active or not first):
+                print_change(run)
+            states[run['id']] = state
+        
+        if first:
+            if watched:
+                print(f"Watching {len(watched)} active run(s)...")
+            else:
+                print("No active runs; waiting for one to start...")
+            first = False
+        
+        if watched and all(run.get('status') == 'completed' for run in watched.values()):
+            failed = [run for run in watched.values() if run.get('conclusion') not in PASSING_CONCLUSIONS]
+            print(f"API requests: {client.stats['requests']} ({client.stats['not_modified']} not modified)")
+            if failed:
+                print(f"ERROR: {len(failed)} of {len(watched)} watched run(s) did not succeed")
+                return 1
+            print(f"SUCCESS: {len(watched)} watched run(s) succeeded")
+            return 0
+        
+        # Poll quickly while something runs, backing off while idle
+        wait = interval if any(run.get('status') in ACTIVE_STATUSES for run in runs) else min(wait * 2, max_interval)
+        if deadline is not None:
+            remaining = deadline - clock()
+            if remaining <= 0:
+                print(f"ERROR: Timed out after {timeout}s with {len(watched)} run(s) watched")
+                return WATCH_TIMEOUT_STATUS
+            wait = min(wait, remaining)
+        sleep(wait)
+
+def show_timings(client, limit=20, pattern=IOS_WORKFLOWS, workers=DEFAULT_WORKERS, branch=None):
+    """Print job and step durations and the critical path of recent runs of matching workflows"""
+    
+    print(f"Timing recent {pattern} workflow runs...")
+    print("=" * 60)
+    
+    filters = {"branch": branch} if branch else {}
+    runs, _ = client.list_runs(limit, **filters)
+    runs = select_runs(runs, pattern)
+    if not runs:
+        print(f"No {pattern} runs among the newest {limit}")
+        return
+    
+    request_seconds = client.stats["request_seconds"]
+    jobs, wall = fetch_jobs(client, runs, workers)
+    request_seconds = client.stats["request_seconds"] - request_seconds
+    
+    for run in runs:
+        print_run_timings(run, jobs[run["id"]])
+    print_summary(summarize(runs, jobs))
+    print(f"Fetched jobs for {len(runs)} run(s) in {wall:.2f}s "
+          f"({request_seconds:.2f}s of requests across {workers} worker(s))")
+
+def search_run_logs(client, run_id, context=3, max_matches=200, keep_path=None):
+    """Download a run's logs archive and print failure lines with context"""
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = keep_path or os.path.join(tmp_dir, f"run-{run_id}-logs.zip")
+        print(f"Downloading logs for run {run_id}...")
+        size = client.download_logs(run_id, path)
+        print(f"Scanning {size / 2**20:.1f} MiB of logs...")
+        counts = print_matches(search_logs(path, context, max_matches))
+    
+    print()
+    if not counts:
+        print(f"No error, xcodebuild or codesign failures found in run {run_id}")
+        return
+    summary = ", ".join(f"{count} {kind}" for kind, count in sorted(counts.items()))
+    print(f"Found {sum(counts.values())} failure line(s): {summary}")
+    if sum(counts.values()) >= max_matches:
+        print(f"WARNING: Stopped after {max_matches} matches; raise --max-matches to see more")
+
+def parse_args(argv=None):
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Check recent GitHub Actions runs for VividAI")
+    parser.add_argument("--repo", default=REPOSITORY,
+                        help=f"owner/name of the repository (default: {REPOSITORY})")
+    parser.add_argument("--api-url", default=os.environ.get("GITHUB_API_URL", API_URL),
+                        help="GitHub API root, e.g. a local stub server (default: $GITHUB_API_URL or api.github.com)")
+    parser.add_argument("--limit", type=int,
+                        help="number of newest runs to show (default: 5, or 20 with --timings)")
+    parser.add_argument("--branch", help="only show runs on this branch")
+    parser.add_argument("--watch", action="store_true",
+                        help="poll until active runs (or the next run) finish; exits 0 if they all passed, "
+                             f"1 if not, {WATCH_TIMEOUT_STATUS} on --timeout")
+    parser.add_argument("--interval", type=float, default=10,
+                        help="seconds between polls while runs are active (default: 10)")
+    parser.add_argument("--max-interval", type=float, default=300,
+                        help="longest wait between idle polls in seconds (default: 300)")
+    parser.add_argument("--timeout", type=float,
+                        help="give up watching after this many seconds")
+    parser.add_argument("--logs", type=int, metavar="RUN_ID",
+                        help="download a run's logs and print error, xcodebuild and codesign failures")
+    parser.add_argument("--context", type=int, default=3,
+                        help="lines of context around each log match (default: 3)")
+    parser.add_argument("--max-matches", type=int, default=200,
+                        help="stop after this many log matches (default: 200)")
+    parser.add_argument("--keep-logs", metavar="PATH",
+                        help="save the downloaded logs archive here instead of a temporary file")
+    parser.add_argument("--timings", action="store_true",
+                        help="show job and step durations and each run's critical path instead of statuses")
+    parser.add_argument("--workflows", default=IOS_WORKFLOWS,
+                        help=f"workflow file pattern for --timings (default: {IOS_WORKFLOWS})")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help=f"concurrent requests for --timings (default: {DEFAULT_WORKERS})")
+    parser.add_argument("--update-history", action="store_true",
+                        help="store runs newer than the history's high-water mark, with their jobs and steps")
+    parser.add_argument("--report", action="store_true",
+                        help="print duration percentiles from the history; exits 1 if runs regressed")
+    parser.add_argument("--db", default=HISTORY_DB,
+                        help="history database (default: .workflow_history.sqlite next to this script)")
+    parser.add_argument("--days", type=int, default=30,
+                        help="report window in days (default: 30)")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="flag runs slower than p50 by more than this fraction (default: 0.2)")
+    parser.add_argument("--recent", type=int, default=5,
+                        help="newest runs per workflow checked for regressions (default: 5)")
+    parser.add_argument("--record", metavar="DIR",
+                        help="save every API response as a fixture for stub_github_server.py")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="do not read or update the ETag cache")
+    add_profile_arguments(parser)
+    return parser.parse_args(argv)
+
+def make_client(args):
+    """Create the API client the command line options describe"""
+    return ActionsClient(args.repo, args.api_url, os.environ.get("GITHUB_TOKEN"),
+                         None if args.no_cache else ETAG_CACHE, pool_size=max(10, args.workers),
+                         record_dir=args.record)
+
+def run_history(args):
+    """Update and/or report on the run history; returns the exit status"""
+    db = open_history(args.db)
+    try:
+        if args.update_history:
+            with make_client(args) as client:
+                runs, with_jobs = update_history(db, client, args.limit, args.workers)
+            print(f"SUCCESS: Stored {runs} run(s), with jobs and steps for {with_jobs}, in {args.db}")
+        if args.report and report(db, args.days, args.threshold, args.recent, branch=args.branch):
+            return 1
+    except Exception as e:
+        print(f"ERROR: Error updating workflow history: {e}")
+        return 1
+    finally:
+        db.close()
+    return 0
+
+def main(argv=None):
+    """Run the mode the command line selects, profiled when asked"""
+    args = parse_args(argv)
+    with profiling(args.profile, args.cprofile):
+        run(args)
+
+def run(args):
+    """Run the mode the command line selects"""
+    limit = args.limit or (20 if args.timings else 5)
+    if limit < 1 or args.workers < 1:
+        print("ERROR: --limit and --workers must be at least 1")
+        sys.exit(2)
+    
+    if args.update_history or args.report:
+        sys.exit(run_history(args))
+    
+    with make_client(args) as client:
+        if args.logs is not None:
+            try:
+                search_run_logs(client, args.logs, args.context, args.max_matches, args.keep_logs)
+            except Exception as e:
+                print(f"ERROR: Error searching logs of run {args.logs}: {e}")
+                sys.exit(1)
+            return
+        if args.watch:
+            try:
+                status = watch_workflows(client, args.limit or 20, args.branch, args.interval,
+                                         args.max_interval, args.timeout)
+            except KeyboardInterrupt:
+                status = 130
+            except Exception as e:
+                print(f"ERROR: Error watching workflow runs: {e}")
+                status = 1
+            sys.exit(status)
+        if args.timings:
+            try:
+                show_timings(client, limit, args.workflows, args.workers, args.branch)
+            except Exception as e:
+                print(f"ERROR: Error timing workflow runs: {e}")
+                sys.exit(1)
+        else:
+            check_workflow_status(client, limit, args.branch)
 
 if __name__ == "__main__":
-    check_workflow_status()
\ No newline at end of file
+    main()
@@ -4,64 +4,67 @@ Script to remove Swift Package Manager Firebase dependencies from Xcode project
 and ensure compatibility with CocoaPods.
 """
 
-import re
+import argparse
+import os
 import sys
 
-def fix_project_dependencies(project_file_path):
-    """Remove Swift Package Manager Firebase references from project.pbxproj"""
-    
-    with open(project_file_path, 'r') as f:
-        content = f.read()
-    
-    # Store original content for backup
-    original_content = content
-    
-    # Remove Firebase framework references from PBXBuildFile section
-    firebase_build_files = [
-        r'\s*A1234567890ABCDEF042 /\* FirebaseAuth in Frameworks \*/ = \{isa = PBXBuildFile; productRef = A1234567890ABCDEF041 /\* FirebaseAuth \*/; \};',
-        r'\s*A1234567890ABCDEF044 /\* FirebaseFirestore in Frameworks \*/ = \{isa = PBXBuildFile; productRef = A1234567890ABCDEF043 /\* FirebaseFirestore \*/; \};',
-        r'\s*A1234567890ABCDEF046 /\* FirebaseAnalytics in Frameworks \*/ = \{isa = PBXBuildFile; productRef = A1234567890ABCDEF045 /\* FirebaseAnalytics \*/; \};'
-    ]
-    
-    for pattern in firebase_build_files:
-        content = re.sub(pattern, '', content)
-    
-    # Remove Firebase references from frameworks section
-    frameworks_section = r'(\s*A1234567890ABCDEF042 /\* FirebaseAuth in Frameworks \*/,?\s*)(\s*A1234567890ABCDEF044 /\* FirebaseFirestore in Frameworks \*/,?\s*)(\s*A1234567890ABCDEF046 /\* FirebaseAnalytics in Frameworks \*/,?\s*)'
-    content = re.sub(frameworks_section, '', content)
-    
-    # Remove Firebase package product dependencies
-    firebase_products = [
-        r'\s*A1234567890ABCDEF081 /\* FirebaseAnalytics \*/ = \{[^}]*\};',
-        r'\s*A1234567890ABCDEF082 /\* FirebaseAuth \*/ = \{[^}]*\};',
-        r'\s*A1234567890ABCDEF083 /\* FirebaseFirestore \*/ = \{[^}]*\};',
-        r'\s*A1234567890ABCDEF084 /\* FirebaseCore \*/ = \{[^}]*\};'
-    ]
-    
-    for pattern in firebase_products:
-        content = re.sub(pattern, '', content)
-    
-    # Remove Firebase references from package product dependencies list
-    package_products_section = r'(\s*A1234567890ABCDEF081 /\* FirebaseAnalytics \*/,?\s*)(\s*A1234567890ABCDEF082 /\* FirebaseAuth \*/,?\s*)(\s*A1234567890ABCDEF083 /\* FirebaseFirestore \*/,?\s*)(\s*A1234567890ABCDEF084 /\* FirebaseCore \*/,?\s*)'
-    content = re.sub(package_products_section, '', content)
+from instrumentation import add_profile_arguments, profiling
+from pbxproj import Transaction, find_projects, print_results
+
+# Swift package removed when no command is given
+DEFAULT_PACKAGE = "firebase-ios-sdk"
+
+# Directory holding the Xcode projects this script edits by default
+REPO_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+def fix_project_dependencies(project_file_paths, package=DEFAULT_PACKAGE, dry_run=False):
+    """Remove a Swift package, and everything only it uses, from each project.pbxproj"""
     
-    # Clean up any double newlines that might have been created
-    content = re.sub(r'\n\n\n+', '\n\n', content)
+    results = Transaction().remove_package(package).commit(project_file_paths, dry_run)
+    print_results(results)
     
-    # Write the modified content back
-    with open(project_file_path, 'w') as f:
-        f.write(content)
+    changed = sum(1 for result in results if result.diff)
+    if dry_run:
+        print(f"SUCCESS: Dry run; {changed} project file(s) would change")
+        return True
     
-    print("SUCCESS: Removed Swift Package Manager Firebase dependencies from project.pbxproj")
-    print("SUCCESS: Project is now compatible with CocoaPods")
+    print(f"SUCCESS: Removed Swift package {package} from {changed} project file(s)")
+    if package == DEFAULT_PACKAGE:
+        print("SUCCESS: Project is now compatible with CocoaPods")
     
     return True
 
+def common_arguments(argument_default=None):
+    """Return a parent parser with the options accepted before and after the command"""
+    common = argparse.ArgumentParser(add_help=False, argument_default=argument_default)
+    common.add_argument("--project", action="append", metavar="PBXPROJ",
+                        help="project.pbxproj to edit; repeatable (default: every project in the repo)")
+    common.add_argument("--dry-run", action="store_true",
+                        help="print a unified diff of the changes instead of writing them")
+    add_profile_arguments(common)
+    return common
+
+def parse_args(argv=None):
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(parents=[common_arguments()],
+                                     description="Remove Swift Package Manager dependencies from the VividAI "
+                                                 f"Xcode projects (default: {DEFAULT_PACKAGE})")
+    commands = parser.add_subparsers(dest="command")
+    # Suppressed defaults, so options left out after the command keep the
+    # values given before it
+    remove = commands.add_parser("remove-package", parents=[common_arguments(argparse.SUPPRESS)],
+                                 help="remove a package with its products, build files and list entries")
+    remove.add_argument("name", help="repository or folder name of the package, e.g. firebase-ios-sdk")
+    return parser.parse_args(argv)
+
 if __name__ == "__main__":
-    project_file = "VividAI.xcodeproj/project.pbxproj"
-    try:
-        fix_project_dependencies(project_file)
-        print("SUCCESS: Project dependencies fixed successfully!")
-    except Exception as e:
-        print(f"ERROR: Error fixing project dependencies: {e}")
-        sys.exit(1)
+    args = parse_args()
+    with profiling(args.profile, args.cprofile):
+        try:
+            package = args.name if args.command == "remove-package" else DEFAULT_PACKAGE
+            fix_project_dependencies(args.project or find_projects(REPO_ROOT), package, args.dry_run)
+            if not args.dry_run:
+                print("SUCCESS: Project dependencies fixed successfully!")
+        except Exception as e:
+            print(f"ERROR: Error fixing project dependencies: {e}")
+            sys.exit(1)
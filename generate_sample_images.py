@@ -4,10 +4,73 @@ Style Examples Sample Image Generator
 Creates placeholder sample images for VividAI style examples
 """
 
+import argparse
+import functools
+import hashlib
+import io
+import json
+import math
 import os
+import re
 import sys
-from PIL import Image, ImageDraw, ImageFont
-import random
+import time
+import zlib
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import PIL
+from PIL import Image, ImageDraw, ImageFont, features
+import numpy as np
+from instrumentation import (add_profile_arguments, count, merge_recording, profiling, run_recorded, span,
+                             worker_origin)
+from sample_textures import Region, render_texture
+
+# Bump whenever create_sample_image or the texture engine changes what it
+# draws, so cached samples from older generators are re-rendered
+GENERATOR_VERSION = 5
+
+# File extension for each format the encoder stage can pick from
+FORMAT_EXTENSIONS = {"JPEG": ".jpg", "PNG": ".png", "WEBP": ".webp"}
+
+# Default encoder stage settings; part of the cache key. Without a byte
+# budget every lossy format is encoded at "quality"; with one, the highest
+# quality in [min_quality, max_quality] that fits is searched for. Only
+# JPEG is tried by default, so the samples keep their .jpg names; PNG and
+# WebP are opt-in through --formats.
+ENCODER_SETTINGS = {
+    "formats": ["JPEG"],
+    "quality": 85,
+    "max_bytes": None,
+    "min_quality": 30,
+    "max_quality": 95,
+}
+
+# Formats allowed in .imagesets; asset catalogs are kept to JPEG and PNG so
+# every Xcode version in use can compile them
+ASSET_CATALOG_FORMATS = ["JPEG", "PNG"]
+
+# Scales written into each .imageset in asset catalog mode; the largest is
+# rendered and the rest are downscaled from it
+ASSET_SCALES = (1, 2, 3)
+
+# Where the app declares the asset name each style's sample is loaded from
+STYLE_EXAMPLE_SWIFT = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                   "VividAI", "Models", "StyleExample.swift")
+
+# Atlas mode: sheet size limit (the texture size every supported device
+# handles), gap between sprites so filtering never bleeds into a neighbour,
+# and the index written next to the sheets
+ATLAS_MAX_SIZE = 4096
+ATLAS_PADDING = 2
+ATLAS_INDEX_NAME = "sample_atlas.json"
+
+# Name of the manifest older versions kept inside the output directory
+MANIFEST_NAME = ".sample_manifest.json"
+
+# Where each output directory's record of the cache key every sample was
+# rendered with is kept (gitignored); outside the output directory, since
+# sample_images/ is tracked and Xcode treats every file inside an .xcassets
+# folder as part of the catalog
+MANIFEST_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".sample_manifests")
 
 # Style definitions with colors and characteristics
 STYLES = {
@@ -125,166 +188,896 @@ STYLES = {
     }
 }
 
-def create_sample_image(style_key, style_info, size=(360, 360)):
-    """Create a sample image for a given style"""
+def style_seed(style_key):
+    """Return the fixed RNG seed for a style so every run draws the same shapes"""
+    # crc32 rather than hash(): str hashes are salted per process
+    return zlib.crc32(style_key.encode("utf-8"))
+
+# TrueType font for captions; None always uses Pillow's built-in font
+FONT_FILE = "Arial.ttf"
+
+@functools.lru_cache(maxsize=None)
+def load_fonts(scale=1):
+    """Load the (large, medium, small) fonts, falling back to Pillow's default"""
+    try:
+        if FONT_FILE is None:
+            raise OSError("no caption font configured")
+        return (ImageFont.truetype(FONT_FILE, 24 * scale),
+                ImageFont.truetype(FONT_FILE, 18 * scale),
+                ImageFont.truetype(FONT_FILE, 14 * scale))
+    except OSError:
+        if scale == 1:
+            return (ImageFont.load_default(),
+                    ImageFont.load_default(),
+                    ImageFont.load_default())
+        # Pillow's built-in font is 10px at every size slot; scale it to match
+        font = ImageFont.load_default(10 * scale)
+        return (font, font, font)
+
+def font_signature():
+    """Identify the font create_sample_image will use, for cache keys"""
+    font = load_fonts()[1]
+    path = getattr(font, "path", None)
+    if isinstance(path, str):
+        return os.path.abspath(path)
+    # Pillow's built-in fallback font changes with the Pillow release
+    return f"default:{PIL.__version__}"
+
+def cache_key(style_key, style_info, size, seed, scales=(1,), encoder=ENCODER_SETTINGS):
+    """Return a content hash of everything that affects a sample's bytes"""
+    payload = {
+        "style_key": style_key,
+        "style": style_info,
+        "size": list(size),
+        "seed": seed,
+        "scales": list(scales),
+        "font": font_signature(),
+        "encoder": encoder,
+        "pillow": PIL.__version__,
+        "version": GENERATOR_VERSION,
+    }
+    encoded = json.dumps(payload, sort_keys=True).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+def manifest_path(output_dir):
+    """Return where the cache manifest for an output directory is kept"""
+    output_dir = os.path.abspath(output_dir)
+    digest = hashlib.sha256(output_dir.encode("utf-8")).hexdigest()[:12]
+    return os.path.join(MANIFEST_CACHE_DIR, f"{os.path.basename(output_dir)}-{digest}.json")
+
+def written_files(path):
+    """Return the files making up one written sample: the file itself, or everything in its .imageset"""
+    if os.path.isdir(path):
+        return sorted(os.path.join(path, name) for name in os.listdir(path))
+    return [path]
+
+def entry_up_to_date(entry, key, output_dir):
+    """Return whether a manifest entry has key and every file it lists still exists"""
+    if not isinstance(entry, dict) or entry.get("key") != key or not entry.get("files"):
+        return False
+    return all(os.path.isfile(os.path.join(output_dir, name)) for name in entry["files"])
+
+def load_manifest(path):
+    """Load a cache manifest, or an empty one"""
+    try:
+        with open(path, 'r') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return manifest.get("entries", {})
+
+def save_manifest(path, entries):
+    """Write a cache manifest, replacing the old one atomically"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump({"version": GENERATOR_VERSION, "entries": entries}, f, indent=2, sort_keys=True)
+        f.write("\n")
+    os.replace(tmp_path, path)
+
+def draw_style_shapes(draw, style_key, style_info, size, scale, seed, origin=(0, 0)):
+    """Draw the geometric elements of the styles without a texture
+
+    seed places the shapes (frame insets, ray angles, line ends), so seeded
+    variants differ. origin is the canvas pixel drawn at the top left of
+    draw, so a tile can be drawn by passing its offset and letting PIL clip
+    whatever falls outside.
+    """
+    width, height = size
+    rng = np.random.default_rng(seed)
     
-    # Create image with background color
-    img = Image.new('RGB', size, style_info['bg_color'])
-    draw = ImageDraw.Draw(img)
+    def px(*values):
+        """Map layout coordinates (x, y pairs) to pixel coordinates"""
+        return [v * scale - origin[i % 2] for i, v in enumerate(values)]
+    
+    def stroke(points):
+        """Scale a stroke width, never dropping below one pixel"""
+        return max(1, points * scale)
+    
+    def inset(low, high):
+        """Pick a seeded distance in points"""
+        return int(rng.integers(low, high + 1))
     
-    # Try to load a font, fallback to default
-    try:
-        font_large = ImageFont.truetype("Arial.ttf", 24)
-        font_medium = ImageFont.truetype("Arial.ttf", 18)
-        font_small = ImageFont.truetype("Arial.ttf", 14)
-    except:
-        font_large = ImageFont.load_default()
-        font_medium = ImageFont.load_default()
-        font_small = ImageFont.load_default()
-    
-    # Draw style-specific elements
     if "professional" in style_key or "executive" in style_key:
         # Professional: Clean lines and geometric shapes
-        draw.rectangle([50, 50, size[0]-50, size[1]-50], outline=style_info['accent_color'], width=3)
-        draw.rectangle([80, 80, size[0]-80, size[1]-80], outline=style_info['text_color'], width=2)
+        x, y = inset(40, 55), inset(40, 55)
+        draw.rectangle(px(x, y, width-x, height-y), outline=style_info['accent_color'], width=stroke(3))
+        draw.rectangle(px(x+25, y+25, width-x-25, height-y-25), outline=style_info['text_color'], width=stroke(2))
         
-    elif "renaissance" in style_key or "oil" in style_key:
-        # Artistic: Curved lines and organic shapes
-        for i in range(5):
-            x1 = random.randint(20, size[0]-40)
-            y1 = random.randint(20, size[1]-40)
-            x2 = x1 + random.randint(20, 60)
-            y2 = y1 + random.randint(20, 60)
-            draw.arc([x1, y1, x2, y2], 0, 180, fill=style_info['accent_color'], width=3)
-            
     elif "anime" in style_key or "disney" in style_key:
         # Cartoon: Rounded shapes and bright colors
-        draw.ellipse([50, 50, size[0]-50, size[1]-50], outline=style_info['accent_color'], width=4)
-        draw.ellipse([80, 80, size[0]-80, size[1]-80], outline=style_info['text_color'], width=2)
+        x, y = inset(40, 55), inset(40, 55)
+        draw.ellipse(px(x, y, width-x, height-y), outline=style_info['accent_color'], width=stroke(4))
+        draw.ellipse(px(x+25, y+25, width-x-25, height-y-25), outline=style_info['text_color'], width=stroke(2))
         
     elif "comic" in style_key:
         # Comic: Bold lines and sharp angles
-        draw.line([(20, 20), (size[0]-20, 20)], fill=style_info['accent_color'], width=5)
-        draw.line([(20, size[1]-20), (size[0]-20, size[1]-20)], fill=style_info['accent_color'], width=5)
-        draw.line([(20, 20), (20, size[1]-20)], fill=style_info['accent_color'], width=5)
-        draw.line([(size[0]-20, 20), (size[0]-20, size[1]-20)], fill=style_info['accent_color'], width=5)
+        x, y = inset(12, 28), inset(12, 28)
+        draw.line(px(x, y, width-x, y), fill=style_info['accent_color'], width=stroke(5))
+        draw.line(px(x, height-y, width-x, height-y), fill=style_info['accent_color'], width=stroke(5))
+        draw.line(px(x, y, x, height-y), fill=style_info['accent_color'], width=stroke(5))
+        draw.line(px(width-x, y, width-x, height-y), fill=style_info['accent_color'], width=stroke(5))
         
-    elif "cyberpunk" in style_key:
-        # Cyberpunk: Neon lines and futuristic elements
-        for i in range(8):
-            x1 = random.randint(10, size[0]-10)
-            y1 = random.randint(10, size[1]-10)
-            x2 = random.randint(10, size[0]-10)
-            y2 = random.randint(10, size[1]-10)
-            draw.line([(x1, y1), (x2, y2)], fill=style_info['accent_color'], width=2)
-            
     elif "fantasy" in style_key:
         # Fantasy: Ornate patterns and mystical elements
-        center_x, center_y = size[0]//2, size[1]//2
+        center_x, center_y = width//2, height//2
+        turn = rng.uniform(0, 60)
+        length = inset(85, 115)
         for i in range(6):
-            angle = i * 60
-            x2 = center_x + int(100 * math.cos(math.radians(angle)))
-            y2 = center_y + int(100 * math.sin(math.radians(angle)))
-            draw.line([(center_x, center_y), (x2, y2)], fill=style_info['accent_color'], width=3)
+            angle = i * 60 + turn
+            x2 = center_x + int(length * math.cos(math.radians(angle)))
+            y2 = center_y + int(length * math.sin(math.radians(angle)))
+            draw.line(px(center_x, center_y, x2, y2), fill=style_info['accent_color'], width=stroke(3))
             
     elif "vintage" in style_key or "film" in style_key:
         # Vintage: Sepia tones and classic elements
-        draw.rectangle([30, 30, size[0]-30, size[1]-30], outline=style_info['text_color'], width=2)
-        draw.rectangle([60, 60, size[0]-60, size[1]-60], outline=style_info['accent_color'], width=1)
+        x, y = inset(22, 38), inset(22, 38)
+        draw.rectangle(px(x, y, width-x, height-y), outline=style_info['text_color'], width=stroke(2))
+        draw.rectangle(px(x+30, y+30, width-x-30, height-y-30), outline=style_info['accent_color'], width=stroke(1))
         
     elif "minimalist" in style_key:
         # Minimalist: Simple lines and clean spaces
-        draw.line([(size[0]//4, size[1]//4), (3*size[0]//4, 3*size[1]//4)], fill=style_info['text_color'], width=2)
-        draw.line([(3*size[0]//4, size[1]//4), (size[0]//4, 3*size[1]//4)], fill=style_info['text_color'], width=2)
-        
-    elif "abstract" in style_key:
-        # Abstract: Random shapes and colors
-        for i in range(10):
-            x1 = random.randint(20, size[0]-40)
-            y1 = random.randint(20, size[1]-40)
-            x2 = x1 + random.randint(10, 30)
-            y2 = y1 + random.randint(10, 30)
-            draw.ellipse([x1, y1, x2, y2], outline=style_info['accent_color'], width=2)
-            
-    elif "watercolor" in style_key:
-        # Watercolor: Soft, flowing shapes
-        for i in range(6):
-            x = random.randint(50, size[0]-50)
-            y = random.randint(50, size[1]-50)
-            radius = random.randint(20, 60)
-            draw.ellipse([x-radius, y-radius, x+radius, y+radius], outline=style_info['accent_color'], width=1)
-            
-    elif "sketch" in style_key:
-        # Sketch: Hand-drawn lines and shading
-        for i in range(15):
-            x1 = random.randint(10, size[0]-10)
-            y1 = random.randint(10, size[1]-10)
-            x2 = random.randint(10, size[0]-10)
-            y2 = random.randint(10, size[1]-10)
-            draw.line([(x1, y1), (x2, y2)], fill=style_info['text_color'], width=1)
-            
-    elif "pop" in style_key:
-        # Pop Art: Bold colors and patterns
-        for i in range(4):
-            x = i * size[0] // 4
-            y = i * size[1] // 4
-            draw.rectangle([x, y, x + size[0]//4, y + size[1]//4], outline=style_info['accent_color'], width=3)
-    
-    # Add style name text
+        x1, x2 = width//4 + inset(-width//16, width//16), 3*width//4 + inset(-width//16, width//16)
+        y1, y2 = height//4 + inset(-height//16, height//16), 3*height//4 + inset(-height//16, height//16)
+        draw.line(px(x1, y1, x2, y2), fill=style_info['text_color'], width=stroke(2))
+        draw.line(px(x2, y1, x1, y2), fill=style_info['text_color'], width=stroke(2))
+
+def layout_caption(style_info, size, scale):
+    """Measure and position the style name and description (in pixels)"""
+    width, height = size
+    _, font_medium, font_small = load_fonts(scale)
+    draw = ImageDraw.Draw(Image.new('RGB', (1, 1)))
+    
     text_bbox = draw.textbbox((0, 0), style_info['name'], font=font_medium)
     text_width = text_bbox[2] - text_bbox[0]
     text_height = text_bbox[3] - text_bbox[1]
+    text_x = (width * scale - text_width) // 2
+    text_y = (height - 60) * scale
     
-    text_x = (size[0] - text_width) // 2
-    text_y = size[1] - 60
+    desc_bbox = draw.textbbox((0, 0), style_info['description'], font=font_small)
+    desc_width = desc_bbox[2] - desc_bbox[0]
+    desc_x = (width * scale - desc_width) // 2
+    desc_y = text_y + text_height + 10 * scale
+    
+    return {
+        "text_xy": (text_x, text_y),
+        "text_box": [text_x-10*scale, text_y-5*scale, text_x+text_width+10*scale, text_y+text_height+5*scale],
+        "desc_xy": (desc_x, desc_y),
+        "desc_box": [desc_x-4*scale, desc_y+desc_bbox[1]-2*scale,
+                     desc_x+desc_width+4*scale, desc_y+desc_bbox[3]+2*scale],
+    }
+
+def shift_layout(layout, left, top):
+    """Return a caption layout moved by (-left, -top) pixels, for drawing into a tile"""
+    return {
+        "text_xy": (layout["text_xy"][0] - left, layout["text_xy"][1] - top),
+        "text_box": [layout["text_box"][0] - left, layout["text_box"][1] - top,
+                     layout["text_box"][2] - left, layout["text_box"][3] - top],
+        "desc_xy": (layout["desc_xy"][0] - left, layout["desc_xy"][1] - top),
+        "desc_box": [layout["desc_box"][0] - left, layout["desc_box"][1] - top,
+                     layout["desc_box"][2] - left, layout["desc_box"][3] - top],
+    }
+
+def draw_caption(draw, style_info, layout, scale, textured):
+    """Draw the style name plate and description from a precomputed layout"""
+    _, font_medium, font_small = load_fonts(scale)
     
     # Draw text background
-    draw.rectangle([text_x-10, text_y-5, text_x+text_width+10, text_y+text_height+5], 
-                   fill=style_info['bg_color'], outline=style_info['text_color'])
+    draw.rectangle(layout["text_box"], fill=style_info['bg_color'], outline=style_info['text_color'],
+                   width=max(1, scale))
     
     # Draw text
-    draw.text((text_x, text_y), style_info['name'], fill=style_info['text_color'], font=font_medium)
+    draw.text(layout["text_xy"], style_info['name'], fill=style_info['text_color'], font=font_medium)
     
-    # Add description
-    desc_bbox = draw.textbbox((0, 0), style_info['description'], font=font_small)
-    desc_width = desc_bbox[2] - desc_bbox[0]
-    desc_x = (size[0] - desc_width) // 2
-    desc_y = text_y + text_height + 10
+    if textured:
+        # Keep the description readable over busy textures
+        draw.rectangle(layout["desc_box"], fill=style_info['bg_color'])
+    
+    draw.text(layout["desc_xy"], style_info['description'], fill=style_info['text_color'], font=font_small)
+
+def render_background(style_key, style_info, size, seed, scale, layers):
+    """Render everything under the caption; returns (image, textured)"""
+    # Artistic styles get a procedural texture; the rest start from a flat background
+    width, height = size
+    pixel_size = (width * scale, height * scale)
+    img = render_texture(style_key, style_info, pixel_size, scale, seed, layers)
+    if img is not None:
+        return img, True
+    
+    # Untextured styles draw a few seeded shapes on a flat background
+    img = Image.new('RGB', pixel_size, style_info['bg_color'])
+    draw_style_shapes(ImageDraw.Draw(img), style_key, style_info, size, scale, seed)
+    return img, False
+
+def create_sample_image(style_key, style_info, size=(360, 360), seed=None, scale=1, layers=None):
+    """Create a sample image for a given style
+
+    size is the layout size in points; the returned image is size * scale
+    pixels, with every shape, stroke and font scaled so that all scales show
+    the same picture. layers is an optional dict that caches the parts that
+    do not depend on the seed (texture bases, caption layout); pass
+    the same dict only for calls with the same style, size and scale.
+    """
+    
+    if seed is None:
+        seed = style_seed(style_key)
+    if layers is None:
+        layers = {}
+    
+    with span("render background", style=style_key, size=size[0], scale=scale):
+        img, textured = render_background(style_key, style_info, size, seed, scale, layers)
+    
+    with span("render caption", style=style_key):
+        if "caption" not in layers:
+            layers["caption"] = layout_caption(style_info, size, scale)
+        draw_caption(ImageDraw.Draw(img), style_info, layers["caption"], scale, textured)
+    
+    return img
+
+def variant_seed(style_key, index):
+    """Return the seed of a style's index-th variant; variant 0 is the regular sample"""
+    return (style_seed(style_key) + index) & 0xFFFFFFFF
+
+def generate_variants(pairs=None, variants_per_style=None, size=(360, 360), scale=1, styles=STYLES):
+    """Yield (style_key, seed, image) for many seeded variants of the styles
+
+    Pass either pairs, an iterable of (style_key, seed), or variants_per_style
+    to get that many variants of every style. Each variant draws from its own
+    RNG, so any (style_key, seed) reproduces exactly through
+    create_sample_image. Fonts, caption layout and seed-independent background
+    layers are built once and reused while consecutive pairs share a style,
+    so group pairs by style for the most reuse.
+    """
+    if (pairs is None) == (variants_per_style is None):
+        raise ValueError("pass exactly one of pairs or variants_per_style")
+    if pairs is None:
+        pairs = ((style_key, variant_seed(style_key, index))
+                 for style_key in styles for index in range(variants_per_style))
+    
+    current_style = None
+    layers = {}
+    for style_key, seed in pairs:
+        if style_key != current_style:
+            current_style, layers = style_key, {}
+        yield style_key, seed, create_sample_image(style_key, styles[style_key], size, seed, scale, layers)
+
+def write_variants(output_dir, variants_per_style, size=(360, 360), settings=ENCODER_SETTINGS):
+    """Write variants_per_style seeded variants of every style into output_dir"""
+    os.makedirs(output_dir, exist_ok=True)
+    written = 0
+    for style_key, seed, img in generate_variants(variants_per_style=variants_per_style, size=size):
+        write_encoded(os.path.join(output_dir, f"{image_name(style_key)}_{seed}"), img, settings)
+        written += 1
+    return written
+
+def image_name(style_key):
+    """Return the asset name a style's sample is stored under"""
+    return f"sample_{style_key}"
+
+def load_sample_image_names(swift_path=STYLE_EXAMPLE_SWIFT):
+    """Return the sampleImageName values declared in StyleExample.swift"""
+    try:
+        with open(swift_path, 'r') as f:
+            content = f.read()
+    except OSError:
+        return set()
+    return set(re.findall(r'sampleImageName:\s*"([^"]+)"', content))
+
+def downscale(img, size):
+    """Shrink a render to size, using a box reduce when the ratio is integral"""
+    factor_x, rem_x = divmod(img.width, size[0])
+    factor_y, rem_y = divmod(img.height, size[1])
+    if rem_x == 0 and rem_y == 0 and factor_x == factor_y:
+        return img.reduce(factor_x)
+    return img.resize(size, Image.LANCZOS)
+
+def encode(img, fmt, quality=None):
+    """Encode img in a single format and return the bytes"""
+    buffer = io.BytesIO()
+    if fmt == "PNG":
+        img.save(buffer, "PNG", optimize=True)
+    else:
+        img.save(buffer, fmt, quality=quality)
+    return buffer.getvalue()
+
+def encode_image(img, settings, max_bytes=None):
+    """Pick the format and highest quality for img that fit within max_bytes
+
+    Returns (data, format, quality), with quality None for lossless PNG.
+    Lossy formats are compared at equal quality and the smallest wins; PNG
+    is taken when it is no larger than the best lossy encode at the top
+    quality being considered. If nothing fits, the smallest encode at
+    min_quality is returned and the caller can see it is over budget.
+    """
+    formats = settings["formats"]
+    lossy = [fmt for fmt in formats if fmt != "PNG"]
+    png = encode(img, "PNG") if "PNG" in formats else None
+    if not lossy:
+        return png, "PNG", None
+    
+    attempts = {}
     
-    draw.text((desc_x, desc_y), style_info['description'], fill=style_info['text_color'], font=font_small)
+    def smallest_at(quality):
+        """Return (data, format) of the smallest lossy encode at quality"""
+        if quality not in attempts:
+            encoded = [(encode(img, fmt, quality), fmt) for fmt in lossy]
+            attempts[quality] = min(encoded, key=lambda item: len(item[0]))
+        return attempts[quality]
     
+    if max_bytes is None:
+        quality = settings["quality"]
+    else:
+        # Binary search for the highest quality whose smallest encode fits
+        low, high = settings["min_quality"], settings["max_quality"]
+        quality = low
+        while low <= high:
+            middle = (low + high) // 2
+            if len(smallest_at(middle)[0]) <= max_bytes:
+                quality, low = middle, middle + 1
+            else:
+                high = middle - 1
+    
+    data, fmt = smallest_at(quality)
+    top = settings["quality"] if max_bytes is None else settings["max_quality"]
+    png_fits = png is not None and (max_bytes is None or len(png) <= max_bytes)
+    if png_fits and len(png) <= len(smallest_at(top)[0]):
+        return png, "PNG", None
+    return data, fmt, quality
+
+def existing_bytes(paths):
+    """Return the total size of whichever of paths currently exist"""
+    return sum(os.path.getsize(path) for path in paths if os.path.isfile(path))
+
+def write_encoded(stem, img, settings, max_bytes=None):
+    """Encode img, write it as stem plus the chosen extension and return the path
+
+    Copies of the same image in the other formats are removed, so switching
+    format never leaves two files with the same asset name behind.
+    """
+    with span("encode", image=os.path.basename(stem), pixels=img.width * img.height):
+        data, fmt, quality = encode_image(img, settings, max_bytes)
+    path = stem + FORMAT_EXTENSIONS[fmt]
+    with span("write", path=path):
+        for extension in FORMAT_EXTENSIONS.values():
+            if stem + extension != path and os.path.exists(stem + extension):
+                os.remove(stem + extension)
+        with open(path, 'wb') as f:
+            f.write(data)
+    count("image bytes written", len(data))
+    return path, len(data)
+
+def write_imageset(output_dir, name, img, size, settings):
+    """Write img and its smaller scales as name.imageset with a Contents.json
+
+    The byte budget applies to the @1x image and grows with pixel count for
+    the larger scales. Returns (imageset_dir, bytes written).
+    """
+    imageset_dir = os.path.join(output_dir, f"{name}.imageset")
+    os.makedirs(imageset_dir, exist_ok=True)
+    
+    images = []
+    total = 0
+    for scale in ASSET_SCALES:
+        stem = os.path.join(imageset_dir, name if scale == 1 else f"{name}@{scale}x")
+        scaled = img
+        if scale != max(ASSET_SCALES):
+            scaled = downscale(img, (size[0] * scale, size[1] * scale))
+        max_bytes = settings["max_bytes"] and settings["max_bytes"] * scale * scale
+        path, written = write_encoded(stem, scaled, settings, max_bytes)
+        total += written
+        images.append({"filename": os.path.basename(path), "idiom": "universal", "scale": f"{scale}x"})
+    
+    contents = {"images": images, "info": {"author": "xcode", "version": 1}}
+    with open(os.path.join(imageset_dir, "Contents.json"), 'w') as f:
+        # Match Xcode's own '"key" : value' formatting to keep diffs quiet
+        json.dump(contents, f, indent=2, separators=(',', ' : '))
+        f.write("\n")
+    return imageset_dir, total
+
+def split_free_rects(free_rects, placed):
+    """Carve a placed (x, y, w, h) rect out of a MaxRects free list in place"""
+    px, py, pw, ph = placed
+    remaining = []
+    for fx, fy, fw, fh in free_rects:
+        if px >= fx + fw or px + pw <= fx or py >= fy + fh or py + ph <= fy:
+            remaining.append((fx, fy, fw, fh))
+            continue
+        # Keep the maximal strips of the free rect on each side of the placed one
+        if px > fx:
+            remaining.append((fx, fy, px - fx, fh))
+        if px + pw < fx + fw:
+            remaining.append((px + pw, fy, fx + fw - px - pw, fh))
+        if py > fy:
+            remaining.append((fx, fy, fw, py - fy))
+        if py + ph < fy + fh:
+            remaining.append((fx, py + ph, fw, fy + fh - py - ph))
+    
+    # Drop free rects wholly contained in another one
+    free_rects[:] = [
+        rect for i, rect in enumerate(remaining)
+        if not any(j != i and other[0] <= rect[0] and other[1] <= rect[1]
+                   and other[0] + other[2] >= rect[0] + rect[2]
+                   and other[1] + other[3] >= rect[1] + rect[3]
+                   and (other != rect or j < i)
+                   for j, other in enumerate(remaining))
+    ]
+
+def pack_rects(sizes, max_size=ATLAS_MAX_SIZE, padding=ATLAS_PADDING):
+    """Pack (w, h) sizes onto as few max_size square sheets as possible
+
+    Uses MaxRects with the bottom-left heuristic, placing the largest rects
+    first, which keeps sprites packed towards the top-left corner so sheets
+    trim tightly. Returns (placements, sheet_count) where placements
+    holds (sheet, x, y) for each size in input order.
+    """
+    order = sorted(range(len(sizes)), key=lambda i: (-sizes[i][0] * sizes[i][1], i))
+    sheets = []
+    placements = [None] * len(sizes)
+    for i in order:
+        width, height = sizes[i][0] + padding, sizes[i][1] + padding
+        if width > max_size or height > max_size:
+            raise ValueError(f"{sizes[i][0]}x{sizes[i][1]} does not fit on a {max_size}px atlas sheet")
+        
+        best = None
+        for sheet, free_rects in enumerate(sheets):
+            for fx, fy, fw, fh in free_rects:
+                if width <= fw and height <= fh:
+                    score = (sheet, fy + height, fx)
+                    if best is None or score < best[0]:
+                        best = (score, sheet, fx, fy)
+        if best is None:
+            sheets.append([(0, 0, max_size, max_size)])
+            best = (None, len(sheets) - 1, 0, 0)
+        
+        _, sheet, x, y = best
+        split_free_rects(sheets[sheet], (x, y, width, height))
+        placements[i] = (sheet, x, y)
+    return placements, len(sheets)
+
+def write_atlas(output_dir, variants_per_style=1, size=(360, 360), settings=ENCODER_SETTINGS,
+                max_size=ATLAS_MAX_SIZE, padding=ATLAS_PADDING):
+    """Render every style (and its variants) into packed atlas sheets plus an index
+
+    The index maps each style key to a list of [sheet, x, y, w, h, seed]
+    rects, one per variant with variant 0 (the regular sample) first, so the
+    app can load one image and slice it. Returns (index, sheet paths, fill
+    ratio of the sheets). Sheets are always PNG, whatever formats settings
+    lists; leftover sheets from a larger earlier atlas are removed.
+    """
+    sprites = list(generate_variants(variants_per_style=variants_per_style, size=size))
+    placements, sheet_count = pack_rects([img.size for _, _, img in sprites], max_size, padding)
+    
+    # Trim each sheet to the area its sprites actually use
+    extents = [[0, 0] for _ in range(sheet_count)]
+    for (_, _, img), (sheet, x, y) in zip(sprites, placements):
+        extents[sheet][0] = max(extents[sheet][0], x + img.width)
+        extents[sheet][1] = max(extents[sheet][1], y + img.height)
+    canvases = [Image.new('RGB', tuple(extent), (0, 0, 0)) for extent in extents]
+    
+    index = {"version": 1, "sheets": [], "sprites": {}}
+    for (style_key, seed, img), (sheet, x, y) in zip(sprites, placements):
+        canvases[sheet].paste(img, (x, y))
+        index["sprites"].setdefault(style_key, []).append([sheet, x, y, img.width, img.height, seed])
+    
+    # Sheets are lossless, so compression never bleeds across the padding and
+    # every sheet of an atlas has the same format
+    sheet_settings = dict(settings, formats=["PNG"])
+    paths = []
+    for sheet, canvas in enumerate(canvases):
+        path, _ = write_encoded(os.path.join(output_dir, f"sample_atlas_{sheet}"), canvas, sheet_settings)
+        paths.append(path)
+        index["sheets"].append({"file": os.path.basename(path), "size": list(canvas.size)})
+    
+    with open(os.path.join(output_dir, ATLAS_INDEX_NAME), 'w') as f:
+        json.dump(index, f, separators=(',', ':'), sort_keys=True)
+    
+    # Remove sheets left over from an earlier, larger atlas
+    for name in os.listdir(output_dir):
+        match = re.fullmatch(r"sample_atlas_(\d+)\.\w+", name)
+        if match and int(match.group(1)) >= sheet_count:
+            os.remove(os.path.join(output_dir, name))
+    
+    used = sum(img.width * img.height for _, _, img in sprites)
+    total = sum(canvas.width * canvas.height for canvas in canvases)
+    return index, paths, used / total if total else 0.0
+
+def tile_regions(pixel_size, tile_size):
+    """Yield the Region of every tile of a canvas, row by row, left to right"""
+    width, height = pixel_size
+    for top in range(0, height, tile_size):
+        for left in range(0, width, tile_size):
+            yield Region(width, height, left, top, min(tile_size, width - left), min(tile_size, height - top))
+
+def render_tile(style_key, style_info, size, seed, scale, region, layout):
+    """Render one tile of a sample image, identical to that window of the full render"""
+    count("tiles rendered")
+    pixel_size = (region.canvas_width, region.canvas_height)
+    img = render_texture(style_key, style_info, pixel_size, scale, seed, region=region)
+    textured = img is not None
+    if not textured:
+        img = Image.new('RGB', (region.width, region.height), style_info['bg_color'])
+        draw_style_shapes(ImageDraw.Draw(img), style_key, style_info, size, scale, seed, (region.left, region.top))
+    
+    # Only the tiles overlapping the caption's rows draw it
+    if region.top <= layout["desc_box"][3] and region.top + region.height > layout["text_box"][1]:
+        draw_caption(ImageDraw.Draw(img), style_info, shift_layout(layout, region.left, region.top),
+                     scale, textured)
     return img
 
-def main():
+def render_tiles(style_key, style_info, size, scale, tile_size, seed=None):
+    """Yield (region, uint8 array) for every tile of a sample image, row by row
+
+    Only one tile is alive at a time; textures never build full-canvas
+    arrays, so memory stays bounded by the tile size however large the
+    canvas is.
+    """
+    if seed is None:
+        seed = style_seed(style_key)
+    layout = layout_caption(style_info, size, scale)
+    for region in tile_regions((size[0] * scale, size[1] * scale), tile_size):
+        yield region, np.asarray(render_tile(style_key, style_info, size, seed, scale, region, layout))
+
+def png_chunk(kind, data):
+    """Return one length/type/data/CRC framed PNG chunk"""
+    return (len(data).to_bytes(4, "big") + kind + data
+            + zlib.crc32(data, zlib.crc32(kind)).to_bytes(4, "big"))
+
+def write_png_tiles(path, pixel_size, tiles):
+    """Stream tiles into an RGB PNG, holding one row of tiles at a time
+
+    PNG scanlines span the whole width, so a row of tiles is gathered into a
+    strip, filtered (Sub) and fed to the compressor before the next row is
+    rendered. Returns the number of bytes written.
+    """
+    width, height = pixel_size
+    compressor = zlib.compressobj(6)
+    strip = None
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        f.write(png_chunk(b"IHDR", width.to_bytes(4, "big") + height.to_bytes(4, "big") + bytes([8, 2, 0, 0, 0])))
+        for region, pixels in tiles:
+            if region.left == 0:
+                strip = np.empty((region.height, width * 3 + 1), dtype=np.uint8)
+                strip[:, 0] = 1
+            rows = pixels.reshape(region.height, -1)
+            start = 1 + region.left * 3
+            strip[:, start:start + rows.shape[1]] = rows
+            if region.left + region.width < width:
+                continue
+            
+            # Sub filter: every byte minus the same channel of the pixel to its left
+            filtered = strip.copy()
+            filtered[:, 4:] -= strip[:, 1:-3]
+            data = compressor.compress(filtered.tobytes())
+            if data:
+                f.write(png_chunk(b"IDAT", data))
+        f.write(png_chunk(b"IDAT", compressor.flush()))
+        f.write(png_chunk(b"IEND", b""))
+        written = f.tell()
+    os.replace(tmp_path, path)
+    return written
+
+def write_raw_tiles(path, pixel_size, tiles):
+    """Write tiles into a raw RGB file (rows of width * 3 bytes) through memory maps
+
+    Only the strip of rows under the current row of tiles is mapped, and it
+    is flushed and unmapped before the next one, so dirty pages never pile
+    up for the whole file. Returns the number of bytes written.
+    """
+    width, height = pixel_size
+    with open(path, 'wb') as f:
+        f.truncate(width * height * 3)
+    strip = None
+    for region, pixels in tiles:
+        if region.left == 0:
+            strip = np.memmap(path, dtype=np.uint8, mode='r+', offset=region.top * width * 3,
+                              shape=(region.height, width, 3))
+        strip[:, region.left:region.left + region.width] = pixels
+        if region.left + region.width == width:
+            strip.flush()
+            del strip
+            strip = None
+    return width * height * 3
+
+# Streaming writers for tiled rendering, keyed by --tile-format
+TILE_WRITERS = {"png": (".png", write_png_tiles), "raw": (".rgb", write_raw_tiles)}
+
+def write_tiled(output_dir, size, scale, tile_size, tile_format="png"):
+    """Render every style tile by tile and stream it to disk; returns [(path, bytes)]"""
+    extension, writer = TILE_WRITERS[tile_format]
+    pixel_size = (size[0] * scale, size[1] * scale)
+    written = []
+    for style_key, style_info in STYLES.items():
+        path = os.path.join(output_dir, image_name(style_key) + extension)
+        tiles = render_tiles(style_key, style_info, size, scale, tile_size)
+        with span("render and write tiles", style=style_key):
+            written.append((path, writer(path, pixel_size, tiles)))
+        count("image bytes written", written[-1][1])
+    return written
+
+def output_paths(output_dir, style_key, asset_catalog):
+    """Return every file a style's sample may currently occupy"""
+    name = image_name(style_key)
+    if asset_catalog:
+        imageset_dir = os.path.join(output_dir, f"{name}.imageset")
+        stems = [os.path.join(imageset_dir, name if scale == 1 else f"{name}@{scale}x")
+                 for scale in ASSET_SCALES]
+    else:
+        stems = [os.path.join(output_dir, name)]
+    return [stem + extension for stem in stems for extension in FORMAT_EXTENSIONS.values()]
+
+# Outcome of one style going through the render and encoder stages
+StyleResult = namedtuple("StyleResult", "style_key path render_time encode_time old_bytes new_bytes")
+
+def render_job(job):
+    """Render a single style; runs in a worker process when parallel"""
+    style_key, style_info, size, scale = job
+    start = time.perf_counter()
+    img = create_sample_image(style_key, style_info, size, seed=style_seed(style_key), scale=scale)
+    return style_key, img, time.perf_counter() - start
+
+def render_stream(jobs, workers):
+    """Yield (style_key, image, render_time) for jobs as they finish rendering, in order"""
+    if workers <= 1 or len(jobs) <= 1:
+        # A generator, so the encoder stage works on one style while the next renders
+        for job in jobs:
+            yield render_job(job)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for result, recording in pool.map(functools.partial(run_recorded, worker_origin(), render_job), jobs):
+            merge_recording(recording)
+            yield result
+
+def encode_job(style_key, img, render_time, output_dir, size, asset_catalog, settings):
+    """Encode and write a rendered style; runs on the encoder thread pool"""
+    start = time.perf_counter()
+    old_bytes = existing_bytes(output_paths(output_dir, style_key, asset_catalog))
+    if asset_catalog:
+        path, new_bytes = write_imageset(output_dir, image_name(style_key), img, size, settings)
+    else:
+        path, new_bytes = write_encoded(os.path.join(output_dir, image_name(style_key)), img,
+                                        settings, settings["max_bytes"])
+    return StyleResult(style_key, path, render_time, time.perf_counter() - start, old_bytes, new_bytes)
+
+def generate_all(output_dir, size=(360, 360), workers=1, force=False, asset_catalog=False,
+                 settings=ENCODER_SETTINGS, encode_threads=None):
+    """Render every style whose cache key changed and run it through the encoder stage
+
+    Rendering runs inline or on a process pool when workers > 1; encoding
+    and writing run on a thread pool, overlapping with rendering. Returns
+    (results, hits) where results holds a StyleResult per rendered style and
+    hits lists the styles that were already up to date. With asset_catalog,
+    output_dir is an .xcassets folder and each style becomes an .imageset
+    holding every scale in ASSET_SCALES.
+    """
+    manifest = load_manifest(manifest_path(output_dir))
+    scales = ASSET_SCALES if asset_catalog else (1,)
+    jobs = []
+    hits = []
+    entries = {}
+    for style_key, style_info in STYLES.items():
+        name = image_name(style_key)
+        key = cache_key(style_key, style_info, size, style_seed(style_key), scales, settings)
+        entry = manifest.get(name)
+        if entry_up_to_date(entry, key, output_dir) and not force:
+            hits.append(style_key)
+            entries[name] = entry
+        else:
+            jobs.append((style_key, style_info, size, max(scales)))
+            entries[name] = {"key": key}
+    
+    count("render cache hits", len(hits))
+    count("render cache misses", len(jobs))
+    with ThreadPoolExecutor(max_workers=encode_threads or os.cpu_count() or 1) as encoders:
+        futures = [encoders.submit(encode_job, style_key, img, render_time, output_dir, size,
+                                   asset_catalog, settings)
+                   for style_key, img, render_time in render_stream(jobs, workers)]
+        results = [future.result() for future in futures]
+    
+    for result in results:
+        entries[image_name(result.style_key)]["files"] = [os.path.relpath(path, output_dir)
+                                                          for path in written_files(result.path)]
+    save_manifest(manifest_path(output_dir), entries)
+    # Older versions kept the manifest inside the output directory
+    stale = os.path.join(output_dir, MANIFEST_NAME)
+    if os.path.exists(stale):
+        os.remove(stale)
+    return results, hits
+
+def print_timing_summary(results, elapsed):
+    """Print per-style render/encode timings and the overall wall time"""
+    print("\nTiming summary (ms):")
+    print(f"  {'style':<24} {'render':>8} {'encode':>8} {'total':>8}")
+    for result in results:
+        print(f"  {result.style_key:<24} {result.render_time * 1000:8.1f} {result.encode_time * 1000:8.1f} "
+              f"{(result.render_time + result.encode_time) * 1000:8.1f}")
+    busy = sum(result.render_time + result.encode_time for result in results)
+    print(f"  {'cpu total':<24} {'':>8} {'':>8} {busy * 1000:8.1f}")
+    print(f"  {'wall time':<24} {'':>8} {'':>8} {elapsed * 1000:8.1f}")
+
+def print_size_report(results, max_bytes=None):
+    """Print bytes written per style against what the output held before"""
+    print("\nSize report (bytes):")
+    print(f"  {'style':<24} {'before':>9} {'after':>9} {'saved':>9}  file")
+    for result in results:
+        over = "  OVER BUDGET" if max_bytes and not os.path.isdir(result.path) and result.new_bytes > max_bytes else ""
+        print(f"  {result.style_key:<24} {result.old_bytes:9d} {result.new_bytes:9d} "
+              f"{result.old_bytes - result.new_bytes:9d}  {os.path.basename(result.path)}{over}")
+    old_total = sum(result.old_bytes for result in results)
+    new_total = sum(result.new_bytes for result in results)
+    percent = f" ({(old_total - new_total) * 100 / old_total:.1f}%)" if old_total else ""
+    print(f"  {'total':<24} {old_total:9d} {new_total:9d} {old_total - new_total:9d}{percent}")
+
+def parse_formats(value):
+    """Parse a comma separated --formats value into encoder format names"""
+    formats = []
+    for name in value.split(","):
+        fmt = name.strip().upper().replace("JPG", "JPEG")
+        if fmt not in FORMAT_EXTENSIONS:
+            raise argparse.ArgumentTypeError(f"unsupported format: {name}")
+        formats.append(fmt)
+    return formats
+
+def parse_args(argv=None):
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Generate VividAI style example sample images")
+    parser.add_argument("--output-dir", default="sample_images",
+                        help="directory to write sample images into (default: sample_images)")
+    parser.add_argument("--size", type=int, default=360,
+                        help="width and height of each sample in points; @1x pixels (default: 360)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="number of worker processes; 1 renders serially (default: CPU count)")
+    parser.add_argument("--asset-catalog", metavar="XCASSETS",
+                        help="write @1x/@2x/@3x .imagesets into this asset catalog "
+                             "(e.g. VividAI/Assets.xcassets) instead of loose JPEGs")
+    parser.add_argument("--max-bytes", type=int, metavar="N",
+                        help="per-image byte budget (for the @1x image in asset catalog mode); "
+                             "the highest quality that fits is used")
+    parser.add_argument("--formats", type=parse_formats, metavar="LIST",
+                        help="comma separated formats to choose from: jpeg, png, webp "
+                             "(default: jpeg; --asset-catalog allows jpeg and png)")
+    parser.add_argument("--encode-threads", type=int, default=os.cpu_count() or 1,
+                        help="encoder/writer threads running alongside rendering (default: CPU count)")
+    parser.add_argument("--variants", type=int, metavar="N",
+                        help="write N seeded variants of every style into OUTPUT_DIR/variants "
+                             "as sample_<style>_<seed>.<ext>")
+    parser.add_argument("--atlas", action="store_true",
+                        help="pack every style (and --variants N variants of each) into atlas sheets "
+                             f"with a {ATLAS_INDEX_NAME} index instead of separate files")
+    parser.add_argument("--atlas-size", type=int, default=ATLAS_MAX_SIZE,
+                        help=f"maximum atlas sheet width and height (default: {ATLAS_MAX_SIZE})")
+    parser.add_argument("--tile-size", type=int, metavar="PIXELS",
+                        help="render in PIXELS x PIXELS tiles and stream each style to disk, keeping "
+                             "memory bounded for very large canvases (see --scale and --tile-format)")
+    parser.add_argument("--tile-format", choices=sorted(TILE_WRITERS), default="png",
+                        help="tiled output: png, or raw interleaved RGB bytes in a .rgb file (default: png)")
+    parser.add_argument("--scale", type=int, default=1,
+                        help="pixels per point for --tile-size renders (default: 1)")
+    parser.add_argument("--force", action="store_true",
+                        help="re-render every style even if its cached sample is up to date")
+    add_profile_arguments(parser)
+    args = parser.parse_args(argv)
+    if args.atlas and args.asset_catalog:
+        parser.error("--atlas writes loose sheets; it cannot be combined with --asset-catalog")
+    if args.tile_size is not None:
+        if args.tile_size < 1:
+            parser.error("--tile-size must be at least 1")
+        if args.atlas or args.asset_catalog or args.variants:
+            parser.error("--tile-size cannot be combined with --atlas, --asset-catalog or --variants")
+    return args
+
+def main(argv=None):
     """Generate all sample images"""
+    args = parse_args(argv)
+    with profiling(args.profile, args.cprofile):
+        generate(args)
+
+def generate(args):
+    """Generate the sample images the parsed command line asks for"""
     
     # Create output directory
-    output_dir = "sample_images"
+    asset_catalog = args.asset_catalog is not None
+    output_dir = args.asset_catalog if asset_catalog else args.output_dir
     os.makedirs(output_dir, exist_ok=True)
     
+    settings = dict(ENCODER_SETTINGS, max_bytes=args.max_bytes)
+    settings["formats"] = args.formats or ENCODER_SETTINGS["formats"]
+    if asset_catalog and not set(settings["formats"]) <= set(ASSET_CATALOG_FORMATS):
+        print(f"ERROR: asset catalogs only take {' and '.join(ASSET_CATALOG_FORMATS).lower()}")
+        sys.exit(2)
+    if "WEBP" in settings["formats"] and not features.check("webp"):
+        print("WARNING: this Pillow build has no WebP support; skipping WebP")
+        settings["formats"] = [fmt for fmt in settings["formats"] if fmt != "WEBP"]
+    if not settings["formats"]:
+        print("ERROR: no usable output formats")
+        sys.exit(1)
+    
     print("Generating sample images for VividAI style examples...")
+    print(f"Using {args.workers} worker(s) at {args.size}x{args.size}")
     
-    # Generate images for each style
-    for style_key, style_info in STYLES.items():
-        print(f"Generating {style_key}...")
-        
-        # Create the image
-        img = create_sample_image(style_key, style_info)
-        
-        # Save the image
-        filename = f"sample_{style_key}.jpg"
-        filepath = os.path.join(output_dir, filename)
-        img.save(filepath, "JPEG", quality=85)
-        
-        print(f"  Saved: {filepath}")
+    if args.tile_size:
+        start = time.perf_counter()
+        written = write_tiled(output_dir, (args.size, args.size), args.scale, args.tile_size, args.tile_format)
+        elapsed = time.perf_counter() - start
+        for path, _ in written:
+            print(f"  Saved: {path}")
+        pixels = args.size * args.scale
+        print(f"\nRendered {len(written)} {pixels}x{pixels} images in {args.tile_size}px tiles "
+              f"in {elapsed:.2f}s ({sum(nbytes for _, nbytes in written)} bytes)")
+        return
+    
+    if args.atlas:
+        start = time.perf_counter()
+        index, paths, fill = write_atlas(output_dir, args.variants or 1, (args.size, args.size),
+                                         settings, args.atlas_size)
+        elapsed = time.perf_counter() - start
+        sprites = sum(len(rects) for rects in index["sprites"].values())
+        for path in paths:
+            print(f"  Saved: {path}")
+        print(f"\nPacked {sprites} sprites onto {len(paths)} sheet(s) in {elapsed:.2f}s "
+              f"({fill:.0%} of sheet area used)")
+        print(f"Index: {os.path.join(output_dir, ATLAS_INDEX_NAME)}")
+        return
+    
+    if args.variants:
+        start = time.perf_counter()
+        variants = write_variants(os.path.join(output_dir, "variants"), args.variants, (args.size, args.size),
+                                  settings)
+        elapsed = time.perf_counter() - start
+        print(f"\nGenerated {variants} variants in {elapsed:.2f}s "
+              f"({elapsed * 1000 / max(variants, 1):.1f} ms each)")
+        return
+    
+    if asset_catalog:
+        declared = load_sample_image_names()
+        for style_key in STYLES:
+            if declared and image_name(style_key) not in declared:
+                print(f"WARNING: {image_name(style_key)} is not a sampleImageName in StyleExample.swift")
+    
+    start = time.perf_counter()
+    results, hits = generate_all(output_dir, (args.size, args.size), args.workers, args.force,
+                                 asset_catalog, settings, args.encode_threads)
+    elapsed = time.perf_counter() - start
+    
+    for result in results:
+        print(f"  Saved: {result.path}")
+    
+    print(f"\nCache: {len(hits)} hit(s), {len(results)} miss(es)")
+    if results:
+        print_timing_summary(results, elapsed)
+        print_size_report(results, None if asset_catalog else args.max_bytes)
+    
+    if asset_catalog:
+        print(f"\nGenerated {len(results)} imagesets in '{output_dir}'")
+        return
     
-    print(f"\nGenerated {len(STYLES)} sample images in '{output_dir}' directory")
+    print(f"\nGenerated {len(results)} sample images in '{output_dir}' directory")
     print("\nNext steps:")
     print("1. Add these images to your Xcode project")
-    print("2. Place them in Assets.xcassets")
+    print("2. Place them in Assets.xcassets (or rerun with --asset-catalog VividAI/Assets.xcassets)")
     print("3. Update image names in StyleExample.swift if needed")
     print("4. Test the implementation")
 
 if __name__ == "__main__":
-    import math
     main()
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+GitHub Actions API Client
+Pooled, paginated and conditional access to the GitHub REST API that backs
+off on rate limits, shared by the workflow scripts
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from urllib.parse import urlencode
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from instrumentation import count, span
+
+# Default API root; point at a local stub server to work offline
+API_URL = "https://api.github.com"
+
+# Repository whose workflows are checked by default
+REPOSITORY = "polashchandradas/VividAI"
+
+# Directory holding the scripts and their caches
+REPO_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# ETag and body of every cached GET, keyed by URL (gitignored)
+ETAG_CACHE = os.path.join(REPO_ROOT, ".github_etag_cache.json")
+
+# Responses kept in the ETag cache; the least recently used are dropped
+ETAG_CACHE_ENTRIES = 500
+
+# Longest single wait for a rate limit, in seconds, before giving up
+MAX_RATE_LIMIT_WAIT = 900
+
+# Wait before retrying a secondary rate limit that names no time
+SECONDARY_RATE_LIMIT_WAIT = 60
+
+# Retries for rate limits and server errors
+MAX_RETRIES = 3
+
+# Seconds to wait for a connection or a response
+REQUEST_TIMEOUT = 30
+
+# Bytes read per chunk when streaming downloads to disk
+DOWNLOAD_CHUNK = 1 << 16
+
+def fixture_name(path):
+    """Return the fixture file name recorded for an API path with its query"""
+    return re.sub(r'[^A-Za-z0-9._-]+', '_', path.strip("/")) + ".json"
+
+def record_fixture(record_dir, path, body, next_path):
+    """Save a response for stub_github_server.py; paths exclude the API root"""
+    os.makedirs(record_dir, exist_ok=True)
+    with open(os.path.join(record_dir, fixture_name(path)), 'w') as f:
+        json.dump({"path": path, "next": next_path, "body": body}, f, indent=1)
+
+class GitHubError(RuntimeError):
+    """A GitHub API request failed"""
+
+    def __init__(self, status, message):
+        super().__init__(f"{status}: {message}")
+        self.status = status
+
+def load_etag_cache(path):
+    """Load the persisted ETag cache, or an empty one"""
+    if path is None:
+        return {}
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_etag_cache(path, cache):
+    """Write the ETag cache atomically, keeping the most recently used entries"""
+    entries = dict(list(cache.items())[-ETAG_CACHE_ENTRIES:])
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(entries, f)
+    os.replace(tmp_path, path)
+
+def error_message(response):
+    """Return the message GitHub sent with a failed response"""
+    try:
+        return response.json().get("message", response.reason)
+    except ValueError:
+        return response.text[:200] or response.reason
+
+class ActionsClient:
+    """GitHub Actions API client for one repository
+
+    Every GET goes through a pooled session and is sent with If-None-Match
+    when an earlier response was cached, so unchanged pages come back as a
+    304 that costs no rate-limit quota. The cache is saved by close(). A
+    client can be shared by threads; set record_dir to save every fresh
+    response as a fixture for stub_github_server.py.
+    """
+
+    def __init__(self, repo=REPOSITORY, api_url=API_URL, token=None, cache_path=ETAG_CACHE,
+                 pool_size=10, max_wait=MAX_RATE_LIMIT_WAIT, sleep=time.sleep, record_dir=None):
+        self.repo = repo
+        self.api_url = api_url.rstrip("/")
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            "Accept": "application/vnd.github+json",
+            "User-Agent": "VividAI-Workflow-Checker",
+            "X-GitHub-Api-Version": "2022-11-28",
+        })
+        if token:
+            self.session.headers["Authorization"] = f"Bearer {token}"
+        self.cache_path = cache_path
+        self.cache = load_etag_cache(cache_path)
+        self.cache_changed = False
+        self.max_wait = max_wait
+        self.sleep = sleep
+        # Epoch second the exhausted quota resets at, or None
+        self.rate_limit_reset = None
+        self.record_dir = record_dir
+        # Guards the cache, the stats and rate_limit_reset across threads
+        self.lock = threading.Lock()
+        # request_seconds sums the latency of every request, however many overlapped
+        self.stats = {"requests": 0, "not_modified": 0, "rate_limit_waits": 0, "request_seconds": 0.0}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Persist the ETag cache and release pooled connections"""
+        if self.cache_path is not None and self.cache_changed:
+            save_etag_cache(self.cache_path, self.cache)
+            self.cache_changed = False
+        self.session.close()
+
+    def url(self, path, params=None):
+        """Return the URL of a repository API path such as actions/runs"""
+        url = f"{self.api_url}/repos/{self.repo}/{path.lstrip('/')}"
+        if params:
+            url += "?" + urlencode(sorted(params.items()))
+        return url
+
+    def wait_for_quota(self):
+        """Sleep until the rate limit resets if an earlier response exhausted it"""
+        with self.lock:
+            reset, self.rate_limit_reset = self.rate_limit_reset, None
+        if reset is None:
+            return
+        delay = reset - time.time() + 1
+        if delay <= 0:
+            return
+        if delay > self.max_wait:
+            raise GitHubError(403, f"rate limit exhausted for another {delay:.0f}s")
+        self.count("rate_limit_waits")
+        self.sleep(delay)
+
+    def count(self, stat, amount=1):
+        """Add to one of the request statistics"""
+        with self.lock:
+            self.stats[stat] += amount
+
+    def retry_delay(self, response, attempt):
+        """Return seconds to wait before retrying a failed response, or None to give up"""
+        if response.status_code >= 500:
+            return 2 ** attempt
+        if response.status_code not in (403, 429):
+            return None
+        if "Retry-After" in response.headers:
+            delay = float(response.headers["Retry-After"])
+        elif response.headers.get("X-RateLimit-Remaining") == "0":
+            delay = float(response.headers.get("X-RateLimit-Reset", 0)) - time.time() + 1
+        elif response.status_code == 429:
+            delay = SECONDARY_RATE_LIMIT_WAIT * 2 ** attempt
+        else:
+            # A 403 without rate-limit headers is a permissions problem
+            return None
+        return max(delay, 0) if delay <= self.max_wait else None
+
+    def get(self, url):
+        """GET a URL; returns (decoded JSON body, URL of the next page or None)"""
+        with self.lock:
+            cached = self.cache.get(url)
+        headers = {"If-None-Match": cached["etag"]} if cached else {}
+        for attempt in range(MAX_RETRIES + 1):
+            self.wait_for_quota()
+            start = time.perf_counter()
+            with span("GET", url=url):
+                response = self.session.get(url, headers=headers, timeout=REQUEST_TIMEOUT)
+            self.count("request_seconds", time.perf_counter() - start)
+            self.count("requests")
+            count("http requests")
+            count("http bytes read", len(response.content))
+            if response.headers.get("X-RateLimit-Remaining") == "0":
+                with self.lock:
+                    self.rate_limit_reset = float(response.headers.get("X-RateLimit-Reset", 0))
+            if response.status_code in (200, 304):
+                break
+            delay = self.retry_delay(response, attempt) if attempt < MAX_RETRIES else None
+            if delay is None:
+                raise GitHubError(response.status_code, error_message(response))
+            if response.status_code < 500:
+                self.count("rate_limit_waits")
+            self.sleep(delay)
+
+        if response.status_code == 304 and cached:
+            self.count("not_modified")
+            count("http not modified")
+            with self.lock:
+                # Re-insert so the entry counts as recently used
+                self.cache.pop(url, None)
+                self.cache[url] = cached
+                self.cache_changed = True
+            body, next_url = cached["body"], cached["next"]
+        elif response.status_code == 304:
+            raise GitHubError(304, f"not modified, but {url} is not cached")
+        else:
+            body = response.json()
+            next_url = response.links.get("next", {}).get("url")
+            etag = response.headers.get("ETag")
+            if etag:
+                with self.lock:
+                    self.cache.pop(url, None)
+                    self.cache[url] = {"etag": etag, "body": body, "next": next_url}
+                    self.cache_changed = True
+
+        # Unchanged pages are recorded from the cache, so a warm cache still
+        # writes a complete fixture set
+        if self.record_dir is not None:
+            record_fixture(self.record_dir, url[len(self.api_url):], body,
+                           next_url[len(self.api_url):] if next_url else None)
+        return body, next_url
+
+    def pages(self, path, params=None):
+        """Yield every page of a repository API listing, following Link headers"""
+        url = self.url(path, params)
+        while url:
+            body, url = self.get(url)
+            yield body
+
+    def list_runs(self, limit=None, **filters):
+        """Return (runs, total_count) for the newest workflow runs, newest first
+
+        filters are query parameters such as branch or status. Only as many
+        pages as needed for limit runs are fetched.
+        """
+        params = dict(filters, per_page=min(limit or 100, 100))
+        runs, total = [], 0
+        for page in self.pages("actions/runs", params):
+            total = page.get("total_count", total)
+            runs.extend(page.get("workflow_runs", []))
+            if limit is not None and len(runs) >= limit:
+                return runs[:limit], total
+        return runs, total
+
+    def get_run(self, run_id):
+        """Return one workflow run"""
+        return self.get(self.url(f"actions/runs/{run_id}"))[0]
+
+    def list_jobs(self, run_id):
+        """Return every job of a workflow run's latest attempt, with its steps"""
+        jobs = []
+        for page in self.pages(f"actions/runs/{run_id}/jobs", {"filter": "latest", "per_page": 100}):
+            jobs.extend(page.get("jobs", []))
+        return jobs
+
+    def download_logs(self, run_id, path, chunk_size=DOWNLOAD_CHUNK):
+        """Stream a run's logs archive to path in chunks; returns the bytes written
+
+        The API redirects to short-lived storage; requests drops the
+        Authorization header when following it to another host.
+        """
+        self.wait_for_quota()
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        written = 0
+        with span("download logs", run_id=run_id), \
+                self.session.get(self.url(f"actions/runs/{run_id}/logs"), stream=True,
+                                 timeout=REQUEST_TIMEOUT) as response:
+            self.count("requests")
+            count("http requests")
+            if response.status_code != 200:
+                raise GitHubError(response.status_code, error_message(response))
+            try:
+                with open(tmp_path, 'wb') as f:
+                    for chunk in response.iter_content(chunk_size):
+                        f.write(chunk)
+                        written += len(chunk)
+                        count("http bytes read", len(chunk))
+                os.replace(tmp_path, path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+        return written
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Timing and Profiling Instrumentation
+Nested timing spans and counters shared by the repo's tools, written out as
+Chrome trace-event JSON (chrome://tracing or ui.perfetto.dev) on request
+"""
+
+import cProfile
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Trace events while recording, or None; spans and counters are no-ops then
+_events = None
+
+# Running counter totals while recording
+_counters = {}
+
+_lock = threading.Lock()
+
+# perf_counter_ns() when recording started; event times are relative to it
+_origin = 0
+
+class _Span:
+    """A timed section recorded as a complete ("X") trace event"""
+
+    __slots__ = ("name", "args", "start")
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter_ns()
+        events = _events
+        if events is not None:
+            events.append({"name": self.name, "ph": "X", "pid": os.getpid(), "tid": threading.get_ident(),
+                           "ts": (self.start - _origin) / 1000, "dur": (end - self.start) / 1000,
+                           "args": self.args})
+        return False
+
+class _NullSpan:
+    """The span handed out while not recording"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+NULL_SPAN = _NullSpan()
+
+def span(name, **args):
+    """Return a context manager timing a section; spans nest by time on each thread"""
+    if _events is None:
+        return NULL_SPAN
+    return _Span(name, args)
+
+def count(name, amount=1):
+    """Add to a named counter such as bytes read or cache hits"""
+    if _events is None:
+        return
+    with _lock:
+        total = _counters[name] = _counters.get(name, 0) + amount
+    _events.append({"name": name, "ph": "C", "pid": os.getpid(),
+                    "ts": (time.perf_counter_ns() - _origin) / 1000, "args": {"value": total}})
+
+def start_recording(origin=None):
+    """Start collecting spans and counters, timed from origin (perf_counter_ns) if given"""
+    global _events, _origin
+    _counters.clear()
+    _origin = time.perf_counter_ns() if origin is None else origin
+    _events = []
+
+def stop_recording():
+    """Stop collecting; returns (trace events, counter totals)"""
+    global _events
+    events, _events = _events, None
+    return events or [], dict(_counters)
+
+def worker_origin():
+    """Return the origin run_recorded needs to record in a worker process, or None when not recording"""
+    return _origin if _events is not None else None
+
+def run_recorded(origin, function, *args):
+    """Call function in a worker process, recording it when origin is not None
+
+    Returns (result, recording) for merge_recording in the parent. Bind
+    the origin from worker_origin() with functools.partial before handing
+    this to a process pool; perf_counter_ns is system-wide, so worker
+    events line up with the parent's.
+    """
+    if origin is None:
+        return function(*args), None
+    start_recording(origin)
+    try:
+        result = function(*args)
+    finally:
+        recording = stop_recording()
+    return result, recording
+
+def merge_recording(recording):
+    """Add the spans and counters of a worker's run_recorded call to this process's recording"""
+    if recording is None or _events is None:
+        return
+    events, counters = recording
+    _events.extend(events)
+    with _lock:
+        for name, total in counters.items():
+            _counters[name] = _counters.get(name, 0) + total
+
+def write_trace(path, events, counters):
+    """Write trace events as Chrome trace-event JSON, with thread names and counter totals"""
+    names = {thread.ident: thread.name for thread in threading.enumerate()}
+    pid = os.getpid()
+    metadata = [{"name": "thread_name", "ph": "M", "pid": event_pid, "tid": tid,
+                 "args": {"name": names.get(tid, f"thread {tid}") if event_pid == pid else f"worker {event_pid}"}}
+                for event_pid, tid in sorted({(event["pid"], event["tid"]) for event in events if "tid" in event})]
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump({"traceEvents": metadata + events, "displayTimeUnit": "ms",
+                   "otherData": {"counters": counters}}, f)
+    os.replace(tmp_path, path)
+
+def print_counters(counters):
+    """Print counter totals"""
+    for name, total in sorted(counters.items()):
+        print(f"  {name:<28} {total:>14,}")
+
+@contextmanager
+def profiling(trace_path=None, cprofile_path=None):
+    """Record the enclosed block when trace_path or cprofile_path is given
+
+    Spans and counters go to trace_path as Chrome trace-event JSON, and a
+    cProfile dump (readable with pstats or snakeviz) to cprofile_path.
+    Spans in worker processes are collected only where the pool runs its
+    tasks through run_recorded.
+    """
+    if not trace_path and not cprofile_path:
+        yield
+        return
+    start_recording()
+    profiler = cProfile.Profile() if cprofile_path else None
+    if profiler is not None:
+        profiler.enable()
+    try:
+        with span("main"):
+            yield
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(cprofile_path)
+            print(f"cProfile stats written to {cprofile_path}")
+        events, counters = stop_recording()
+        if trace_path:
+            write_trace(trace_path, events, counters)
+            print(f"Trace written to {trace_path} ({len(events)} events)")
+        if counters:
+            print("Counters:")
+            print_counters(counters)
+
+def add_profile_arguments(parser):
+    """Add the --profile and --cprofile options every tool shares"""
+    parser.add_argument("--profile", metavar="TRACE_JSON",
+                        help="write timing spans and counters as Chrome trace-event JSON "
+                             "(open in chrome://tracing or ui.perfetto.dev)")
+    parser.add_argument("--cprofile", metavar="PSTATS",
+                        help="also write a cProfile dump, readable with python -m pstats")
@@ -0,0 +1,929 @@
+#!/usr/bin/env python3
+"""
+Xcode Project File Model
+Parses project.pbxproj (the OpenStep plist format) in a single pass into an
+object graph indexed by object ID and isa, and writes it back with every
+untouched byte preserved
+"""
+
+import difflib
+import functools
+import hashlib
+import os
+import pickle
+import posixpath
+import re
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from instrumentation import count, merge_recording, run_recorded, span, worker_origin
+
+# Whitespace and comments between tokens; group 1 is the last /* */ comment
+TRIVIA = re.compile(r'(?:\s+|/\*(.*?)\*/|//[^\n]*)*', re.S)
+
+# One token: a quoted string, an unquoted string or a punctuation character
+TOKEN = re.compile(r'"((?:[^"\\]|\\.)*)"|((?:[^\s{}()=;,"/]|/(?![*/]))+)|([{}()=;,])', re.S)
+
+# Strings Xcode writes without quotes
+UNQUOTED = re.compile(r'[A-Za-z0-9_$/:.]+')
+
+ESCAPES = {"n": "\n", "t": "\t", '"': '"', "\\": "\\"}
+
+# Object types Xcode writes on a single line
+SINGLE_LINE_ISAS = ("PBXBuildFile", "PBXFileReference")
+
+# Objects that only make sense alongside an object they name in a plain
+# (non-array) field; they are collected together with it
+DEPENDENT_ISAS = ("PBXBuildFile", "XCSwiftPackageProductDependency", "PBXTargetDependency",
+                  "PBXContainerItemProxy")
+
+# Swift package reference types
+PACKAGE_ISAS = ("XCRemoteSwiftPackageReference", "XCLocalSwiftPackageReference")
+
+# Bump whenever parsing or PBXProject's attributes change, so cached parses
+# from older versions are ignored
+CACHE_VERSION = 1
+
+# Parsed projects kept in a parse cache directory; older entries are pruned
+CACHE_ENTRIES = 16
+
+# Directories never searched for project files
+SKIPPED_DIRS = {"Pods", "DerivedData", "build", "node_modules"}
+
+# Where a field of a parsed object sits in the source text: the key, the
+# value and the ';' ending the field, plus (value, start, end) for every
+# array item and the position of the array's ')'
+FieldSpan = namedtuple("FieldSpan", "key start end stop items close")
+
+class PBXParseError(ValueError):
+    """Raised when project.pbxproj is not a well-formed OpenStep plist"""
+
+class PBXObject:
+    """One entry of the objects dictionary"""
+
+    __slots__ = ("id", "isa", "fields", "comment", "span", "field_spans", "close")
+
+    def __init__(self, object_id, fields, comment=None, span=None, field_spans=None, close=None):
+        self.id = object_id
+        self.isa = fields.get("isa")
+        self.fields = fields
+        self.comment = comment
+        # Source positions; None for objects added since the file was parsed
+        self.span = span
+        self.field_spans = field_spans
+        self.close = close
+
+    def __repr__(self):
+        return f"PBXObject({self.id!r}, {self.isa!r}, {self.comment!r})"
+
+def quote(value):
+    """Return a string as Xcode writes it, quoted only when it has to be"""
+    if UNQUOTED.fullmatch(value):
+        return value
+    escaped = value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n").replace("\t", "\\t")
+    return f'"{escaped}"'
+
+def line_start(text, pos):
+    """Return the start of pos's line if only whitespace precedes pos on it, else pos"""
+    start = text.rfind("\n", 0, pos) + 1
+    return start if text[start:pos].isspace() or start == pos else pos
+
+def line_end(text, pos):
+    """Return the end of pos's line (past the newline) if only whitespace follows pos, else pos"""
+    end = text.find("\n", pos)
+    return end + 1 if end != -1 and (text[pos:end].isspace() or end == pos) else pos
+
+class _Parser:
+    """Recursive descent parser over the project text"""
+
+    def __init__(self, text):
+        self.text = text
+        self.pos = 0
+
+    def error(self, message, pos):
+        line = self.text.count("\n", 0, pos) + 1
+        raise PBXParseError(f"{message} at line {line}")
+
+    def token(self):
+        """Return (kind, value, start, end, comment) of the next token
+
+        kind is "string" or the punctuation character itself, and comment is
+        the last /* */ comment between the previous token and this one.
+        """
+        trivia = TRIVIA.match(self.text, self.pos)
+        comment = trivia.group(1) and trivia.group(1).strip()
+        start = trivia.end()
+        match = TOKEN.match(self.text, start)
+        if match is None:
+            if start >= len(self.text):
+                self.error("unexpected end of file", start)
+            self.error(f"unexpected character {self.text[start]!r}", start)
+        self.pos = match.end()
+        quoted, word, punct = match.groups()
+        if punct is not None:
+            return punct, punct, start, self.pos, comment
+        if quoted is not None:
+            word = re.sub(r'\\(.)', lambda m: ESCAPES.get(m.group(1), m.group(1)), quoted)
+        return "string", word, start, self.pos, comment
+
+    def expect(self, kind):
+        token = self.token()
+        if token[0] != kind:
+            self.error(f"expected {kind!r} but found {token[1]!r}", token[2])
+        return token
+
+    def value(self, token, record=False):
+        """Parse the value starting at token; returns (value, end, items, close)"""
+        kind, value, start, end, _ = token
+        if kind == "string":
+            return value, end, None, None
+        if kind == "{":
+            fields, _, close = self.dictionary()
+            return fields, self.pos, None, None
+        if kind == "(":
+            items, spans, close = self.array(record)
+            return items, self.pos, spans, close
+        self.error(f"unexpected {value!r}", start)
+
+    def dictionary(self, record=False):
+        """Parse up to the closing '}'; returns (fields, field spans or None, close)"""
+        fields = {}
+        spans = {} if record else None
+        while True:
+            kind, key, key_start, _, _ = self.token()
+            if kind == "}":
+                return fields, spans, key_start
+            if kind != "string":
+                self.error(f"expected a key but found {key!r}", key_start)
+            self.expect("=")
+            token = self.token()
+            fields[key], end, items, close = self.value(token, record)
+            stop = self.expect(";")[3]
+            if record:
+                spans[key] = FieldSpan(key_start, token[2], end, stop, items, close)
+
+    def array(self, record=False):
+        """Parse up to the closing ')'; returns (items, item spans or None, close)"""
+        items = []
+        spans = [] if record else None
+        while True:
+            token = self.token()
+            if token[0] == ")":
+                return items, spans, token[2]
+            value, end, _, _ = self.value(token)
+            items.append(value)
+            separator = self.token()
+            if record:
+                spans.append((value, token[2], separator[3] if separator[0] == "," else end))
+            if separator[0] == ")":
+                return items, spans, separator[2]
+            if separator[0] != ",":
+                self.error(f"expected ',' but found {separator[1]!r}", separator[2])
+
+    def objects(self, project):
+        """Parse the objects dictionary straight into project's indexes"""
+        text = self.text
+        while True:
+            kind, object_id, start, _, _ = self.token()
+            if kind == "}":
+                project.objects_close = start
+                return
+            if kind != "string":
+                self.error(f"expected an object ID but found {object_id!r}", start)
+            comment = self.expect("=")[4]
+            self.expect("{")
+            fields, spans, close = self.dictionary(record=True)
+            stop = self.expect(";")[3]
+            if "isa" not in fields:
+                self.error(f"object {object_id} has no isa", start)
+            project.index(PBXObject(object_id, fields, comment,
+                                    (line_start(text, start), line_end(text, stop)), spans, close))
+
+    def root(self, project):
+        """Parse the top-level dictionary, handing the objects dictionary to objects()"""
+        self.expect("{")
+        while True:
+            kind, key, start, _, _ = self.token()
+            if kind == "}":
+                break
+            self.expect("=")
+            if key == "objects":
+                self.expect("{")
+                self.objects(project)
+            else:
+                project.header[key] = self.value(self.token())[0]
+            self.expect(";")
+        if TRIVIA.match(self.text, self.pos).end() != len(self.text):
+            self.error("unexpected text after the project", self.pos)
+
+class PBXProject:
+    """A parsed project.pbxproj
+
+    objects maps object IDs to PBXObjects and by_isa maps each isa to its
+    objects in file order. Edits go through the methods below, which update
+    the graph and record the text changes they imply; serialize() applies
+    those changes to the original text, so everything else is written back
+    byte for byte and an edit costs time in proportion to its size.
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self.header = {}
+        self.objects = {}
+        self.by_isa = {}
+        self.objects_close = None
+        # Pending text changes against self.text
+        self.deleted = set()
+        self.replaced = {}
+        self.appended = {}
+        self.inserted_fields = {}
+        self.added = {}
+        # Lazily built map from file reference paths to object IDs
+        self.paths = None
+        # IDs defined more than once; the last definition wins
+        self.duplicates = []
+        with span("pbxproj parse", chars=len(text)):
+            _Parser(text).root(self)
+        if self.objects_close is None:
+            raise PBXParseError("project has no objects dictionary")
+
+    @classmethod
+    def load(cls, path):
+        """Parse the project file at path"""
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            return cls(f.read())
+
+    def save(self, path, text=None):
+        """Write the project (or already serialized text) to path, replacing it atomically"""
+        if text is None:
+            text = self.serialize()
+        tmp_path = path + ".tmp"
+        with span("pbxproj write", path=path):
+            with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+                f.write(text)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        count("pbxproj chars written", len(text))
+
+    @property
+    def root_id(self):
+        return self.header.get("rootObject")
+
+    def index(self, obj):
+        previous = self.objects.get(obj.id)
+        if previous is not None:
+            self.duplicates.append(obj.id)
+            del self.by_isa[previous.isa][obj.id]
+        self.objects[obj.id] = obj
+        self.by_isa.setdefault(obj.isa, {})[obj.id] = obj
+        if self.paths is not None and obj.isa == "PBXFileReference":
+            self.paths.setdefault(obj.fields.get("path"), obj.id)
+
+    def get(self, object_id):
+        """Return the object with this ID, or None"""
+        return self.objects.get(object_id)
+
+    def objects_of(self, isa):
+        """Return every object of the given isa, in file order"""
+        return list(self.by_isa.get(isa, {}).values())
+
+    def sources_phases(self, target_name=None):
+        """Return the IDs of a native target's Sources build phases
+
+        The target is the one named target_name, or else the first one,
+        which is the app in these projects; test targets are left alone.
+        """
+        targets = [target for target in self.objects_of("PBXNativeTarget")
+                   if target_name is None or self.display_name(target.id) == target_name]
+        if not targets:
+            return []
+        return [phase_id for phase_id in targets[0].fields.get("buildPhases", [])
+                if self.get(phase_id) is not None and self.get(phase_id).isa == "PBXSourcesBuildPhase"]
+
+    def display_name(self, object_id):
+        """Return the name Xcode shows for an object: its name, else its path"""
+        obj = self.objects.get(object_id)
+        if obj is None:
+            return None
+        return obj.fields.get("name") or obj.fields.get("path") or obj.fields.get("productName")
+
+    def file_reference(self, path):
+        """Return the PBXFileReference whose path is path, or None"""
+        if self.paths is None:
+            self.paths = {}
+            for ref in self.objects_of("PBXFileReference"):
+                self.paths.setdefault(ref.fields.get("path"), ref.id)
+        return self.objects.get(self.paths.get(path))
+
+    def find_group(self, name):
+        """Return the first PBXGroup Xcode shows as name, or None"""
+        for group in self.objects_of("PBXGroup"):
+            if self.display_name(group.id) == name:
+                return group
+        return None
+
+    def tree_paths(self):
+        """Return {object ID: path} for every group and file reachable from the main group
+
+        Paths are resolved through the group hierarchy relative to the
+        directory holding the .xcodeproj, as normalized POSIX paths ("." for
+        that directory). Items outside the source tree, such as built
+        products and SDK frameworks, are left out.
+        """
+        root = self.objects.get(self.root_id)
+        paths = {}
+        stack = [(root.fields.get("mainGroup"), ".")] if root is not None else []
+        while stack:
+            object_id, parent = stack.pop()
+            obj = self.objects.get(object_id)
+            if obj is None or object_id in paths:
+                continue
+            tree = obj.fields.get("sourceTree", "<group>")
+            path = obj.fields.get("path", "")
+            if tree == "<group>":
+                paths[object_id] = posixpath.normpath(posixpath.join(parent, path))
+            elif tree == "SOURCE_ROOT":
+                paths[object_id] = posixpath.normpath(path or ".")
+            else:
+                continue
+            stack.extend((child, paths[object_id]) for child in obj.fields.get("children", ()))
+        return paths
+
+    def new_id(self, seed):
+        """Return a deterministic, unused 24-digit object ID derived from seed
+
+        The same seed gives the same ID in every project unless that ID is
+        already taken, in which case the seed is salted until it is free.
+        """
+        salt = 0
+        while True:
+            digest = hashlib.sha1(f"{seed}#{salt}".encode("utf-8") if salt else seed.encode("utf-8"))
+            object_id = digest.hexdigest()[:24].upper()
+            if object_id not in self.objects:
+                return object_id
+            salt += 1
+
+    def holders(self, object_id, isas, field):
+        """Return the objects of the given isas whose field array lists object_id"""
+        return [obj for isa in isas for obj in self.objects_of(isa) if object_id in obj.fields.get(field, ())]
+
+    def referenced_ids(self, value):
+        """Yield every object ID a field value (string, array or dictionary) refers to"""
+        if isinstance(value, str):
+            if value in self.objects:
+                yield value
+        elif isinstance(value, list):
+            for item in value:
+                yield from self.referenced_ids(item)
+        elif isinstance(value, dict):
+            for item in value.values():
+                yield from self.referenced_ids(item)
+
+    def reverse_index(self):
+        """Return {object ID: {referrer ID: [field, ...]}} for every reference in the graph"""
+        index = {}
+        for obj in self.objects.values():
+            for field, value in obj.fields.items():
+                if field == "isa":
+                    continue
+                for target in self.referenced_ids(value):
+                    index.setdefault(target, {}).setdefault(obj.id, []).append(field)
+        return index
+
+    def collect(self, roots):
+        """Remove roots and everything that only exists because of them
+
+        Builds the reverse-reference index once and walks the graph once.
+        An object is collected when it is a root, when it is one of
+        DEPENDENT_ISAS and names a collected object in a plain field (a
+        build file for a removed product), or when every object referring
+        to it has been collected (an orphan). References that surviving
+        objects hold to collected objects are then detached: array entries
+        are removed and plain fields dropped. The project object itself is
+        never collected. Returns (collected objects, detached references).
+        """
+        referrers = self.reverse_index()
+        remaining = {object_id: len(holders) for object_id, holders in referrers.items()}
+        collected = {}
+        stack = list(roots)
+        while stack:
+            object_id = stack.pop()
+            if object_id in collected or object_id == self.root_id or object_id not in self.objects:
+                continue
+            obj = self.objects[object_id]
+            collected[object_id] = obj
+            for referrer_id, fields in referrers.get(object_id, {}).items():
+                referrer = self.objects[referrer_id]
+                if referrer.isa in DEPENDENT_ISAS and any(not isinstance(referrer.fields[field], list)
+                                                          for field in fields):
+                    stack.append(referrer_id)
+            children = {child for field, value in obj.fields.items() if field != "isa"
+                        for child in self.referenced_ids(value)}
+            for child in children:
+                remaining[child] -= 1
+                if remaining[child] == 0:
+                    stack.append(child)
+
+        detached = 0
+        for object_id in collected:
+            for referrer_id, fields in referrers.get(object_id, {}).items():
+                if referrer_id in collected:
+                    continue
+                for field in fields:
+                    if isinstance(self.objects[referrer_id].fields.get(field), list):
+                        self.remove_item(referrer_id, field, object_id)
+                    else:
+                        self.remove_field(referrer_id, field)
+                    detached += 1
+        for object_id in collected:
+            self.remove_object(object_id)
+        return list(collected.values()), detached
+
+    def is_edited(self):
+        """Return True if any edit is pending"""
+        return bool(self.deleted or self.replaced or self.appended or self.inserted_fields or self.added)
+
+    # Edits
+
+    def add_object(self, object_id, fields, comment=None):
+        """Add a new object; fields must include isa. Returns the PBXObject"""
+        if object_id in self.objects:
+            raise ValueError(f"object ID {object_id} is already in use")
+        obj = PBXObject(object_id, dict(fields), comment)
+        self.index(obj)
+        self.added.setdefault(obj.isa, []).append(object_id)
+        return obj
+
+    def remove_object(self, object_id):
+        """Remove an object (not the references other objects hold to it)"""
+        obj = self.objects.pop(object_id)
+        del self.by_isa[obj.isa][object_id]
+        if self.paths is not None and self.paths.get(obj.fields.get("path")) == object_id:
+            del self.paths[obj.fields["path"]]
+        if obj.span is None:
+            self.added[obj.isa].remove(object_id)
+        else:
+            self.deleted.add(obj.span)
+        return obj
+
+    def append_item(self, object_id, field, value):
+        """Append value to an array field of an object"""
+        obj = self.objects[object_id]
+        obj.fields.setdefault(field, []).append(value)
+        if obj.span is None:
+            return
+        if field in obj.field_spans:
+            self.appended.setdefault((object_id, field), []).append(value)
+        else:
+            self.inserted_fields.setdefault(object_id, {})[field] = obj.fields[field]
+
+    def remove_item(self, object_id, field, value):
+        """Remove the first occurrence of value from an array field; returns False if absent"""
+        obj = self.objects[object_id]
+        items = obj.fields.get(field)
+        if not isinstance(items, list) or value not in items:
+            return False
+        items.remove(value)
+        if obj.span is None:
+            return True
+        pending = self.appended.get((object_id, field), [])
+        if value in pending:
+            pending.remove(value)
+            return True
+        if field in self.inserted_fields.get(object_id, {}):
+            return True
+        for item, start, end in obj.field_spans[field].items:
+            span = (line_start(self.text, start), line_end(self.text, end))
+            if item == value and span not in self.deleted:
+                self.deleted.add(span)
+                return True
+        return True
+
+    def set_field(self, object_id, field, value):
+        """Set a string, array or dictionary field, replacing any current value"""
+        obj = self.objects[object_id]
+        obj.fields[field] = value
+        if obj.span is None:
+            return
+        span = obj.field_spans.get(field)
+        if span is None:
+            self.inserted_fields.setdefault(object_id, {})[field] = value
+            return
+        self.appended.pop((object_id, field), None)
+        for _, start, end in span.items or ():
+            self.deleted.discard((line_start(self.text, start), line_end(self.text, end)))
+        indent = self.indent_of(span.key)
+        self.replaced[(span.start, span.end)] = self.render_value(value, indent, obj.isa in SINGLE_LINE_ISAS)
+
+    def remove_field(self, object_id, field):
+        """Remove a field from an object if it has one"""
+        obj = self.objects[object_id]
+        if obj.fields.pop(field, None) is None or obj.span is None:
+            return
+        if field in self.inserted_fields.get(object_id, {}):
+            del self.inserted_fields[object_id][field]
+            return
+        span = obj.field_spans[field]
+        self.appended.pop((object_id, field), None)
+        self.replaced.pop((span.start, span.end), None)
+        self.deleted.add((line_start(self.text, span.key), line_end(self.text, span.stop)))
+
+    # Serialization
+
+    def indent_of(self, pos):
+        """Return the whitespace that starts pos's line"""
+        start = self.text.rfind("\n", 0, pos) + 1
+        end = start
+        while end < pos and self.text[end] in " \t":
+            end += 1
+        return self.text[start:end]
+
+    def render_reference(self, value):
+        """Render a string, adding the /* comment */ Xcode shows after object IDs"""
+        obj = self.objects.get(value)
+        if obj is not None and obj.comment:
+            return f"{quote(value)} /* {obj.comment} */"
+        return quote(value)
+
+    def render_value(self, value, indent, inline):
+        """Render a value whose first line continues a line indented by indent"""
+        if isinstance(value, str):
+            return self.render_reference(value)
+        inner = indent + "\t"
+        if isinstance(value, list):
+            if inline:
+                return "(" + "".join(f"{self.render_value(item, inner, True)}, " for item in value) + ")"
+            return ("(\n" + "".join(f"{inner}{self.render_value(item, inner, False)},\n" for item in value)
+                    + f"{indent})")
+        if inline:
+            return "{" + "".join(f"{quote(key)} = {self.render_value(item, inner, True)}; "
+                                 for key, item in value.items()) + "}"
+        return ("{\n" + "".join(f"{inner}{quote(key)} = {self.render_value(item, inner, False)};\n"
+                                for key, item in value.items()) + f"{indent}}}")
+
+    def render_object(self, obj):
+        """Render a new object as a full entry of the objects dictionary"""
+        fields = {"isa": obj.isa}
+        fields.update(sorted((key, value) for key, value in obj.fields.items() if key != "isa"))
+        key = self.render_reference(obj.id)
+        return f"\t\t{key} = {self.render_value(fields, chr(9) * 2, obj.isa in SINGLE_LINE_ISAS)};\n"
+
+    def section_insertion(self, isa, objects_text):
+        """Return (position, text) adding rendered objects to isa's section"""
+        marker = self.text.find(f"/* End {isa} section */")
+        if marker != -1:
+            return marker, objects_text
+        section = f"/* Begin {isa} section */\n{objects_text}/* End {isa} section */\n"
+        for match in re.finditer(r'^/\* Begin (\w+) section \*/$', self.text, re.M):
+            if match.group(1) > isa:
+                return match.start(), section + "\n"
+        return line_start(self.text, self.objects_close), "\n" + section
+
+    def section_removal(self, isa):
+        """Return the deletion of isa's emptied section markers and the blank line before them"""
+        begin = self.text.find(f"/* Begin {isa} section */")
+        end = self.text.find(f"/* End {isa} section */", begin)
+        if begin == -1 or end == -1:
+            return []
+        end = line_end(self.text, end + len(f"/* End {isa} section */"))
+        if self.text[begin - 2:begin] == "\n\n":
+            begin -= 1
+        return [(begin, end, "")]
+
+    def array_insertion(self, obj, field, values):
+        """Return (position, text) appending values to one of obj's parsed arrays"""
+        close = obj.field_spans[field].close
+        start = line_start(self.text, close)
+        if start == close:
+            return close, "".join(f"{self.render_reference(value)}, " for value in values)
+        items = obj.field_spans[field].items
+        indent = self.indent_of(items[-1][1]) if items else self.indent_of(close) + "\t"
+        return start, "".join(f"{indent}{self.render_reference(value)},\n" for value in values)
+
+    def field_insertion(self, obj, fields):
+        """Return (position, text) adding new fields before obj's closing brace"""
+        start = line_start(self.text, obj.close)
+        if start == obj.close:
+            return obj.close, "".join(f"{quote(key)} = {self.render_value(value, '', True)}; "
+                                      for key, value in fields.items())
+        indent = self.indent_of(obj.close) + "\t"
+        return start, "".join(f"{indent}{quote(key)} = {self.render_value(value, indent, False)};\n"
+                              for key, value in fields.items())
+
+    def serialize(self):
+        """Return the project text with every pending edit applied"""
+        edits = [(start, end, "") for start, end in self.deleted]
+        edits.extend((start, end, text) for (start, end), text in self.replaced.items())
+        for (object_id, field), values in self.appended.items():
+            obj = self.objects.get(object_id)
+            if obj is not None and values:
+                pos, text = self.array_insertion(obj, field, values)
+                edits.append((pos, pos, text))
+        for object_id, fields in self.inserted_fields.items():
+            obj = self.objects.get(object_id)
+            if obj is not None and fields:
+                pos, text = self.field_insertion(obj, fields)
+                edits.append((pos, pos, text))
+        for isa, object_ids in self.added.items():
+            if object_ids:
+                pos, text = self.section_insertion(
+                    isa, "".join(self.render_object(self.objects[object_id]) for object_id in object_ids))
+                edits.append((pos, pos, text))
+
+        for isa, objects in self.by_isa.items():
+            if not objects and not self.added.get(isa):
+                edits.extend(self.section_removal(isa))
+
+        # Insertions sort before deletions starting at the same place; edits
+        # inside a deleted object are dropped along with it
+        edits.sort(key=lambda edit: (edit[0], edit[1]))
+        chunks = []
+        cursor = 0
+        for start, end, text in edits:
+            if start < cursor:
+                continue
+            chunks.append(self.text[cursor:start])
+            chunks.append(text)
+            cursor = end
+        chunks.append(self.text[cursor:])
+        return "".join(chunks)
+
+# Build phases that list PBXBuildFiles in their files array
+BUILD_PHASE_ISAS = ("PBXSourcesBuildPhase", "PBXResourcesBuildPhase", "PBXFrameworksBuildPhase",
+                    "PBXHeadersBuildPhase", "PBXCopyFilesBuildPhase")
+
+def add_source_file(project, name, group_name, file_id, build_id, target_name=None):
+    """Register a Swift file in a group and a target's Sources phase; returns change messages
+
+    The target is the one named target_name, or else the first one.
+    """
+    if project.file_reference(name) is not None:
+        return [f"Skipped: {name} is already in the project"]
+    if file_id in project.objects or build_id in project.objects:
+        return [f"WARNING: Skipped {name}: its object IDs are already in use"]
+    group = project.find_group(group_name)
+    if group is None:
+        return [f"WARNING: Skipped {name}: no '{group_name}' group in the project"]
+    phases = project.sources_phases(target_name)
+    if not phases:
+        return [f"WARNING: Skipped {name}: no Sources build phase for target '{target_name or 'first'}'"]
+
+    project.add_object(file_id, {
+        "isa": "PBXFileReference",
+        "lastKnownFileType": "sourcecode.swift",
+        "path": name,
+        "sourceTree": "<group>",
+    }, name)
+    project.add_object(build_id, {"isa": "PBXBuildFile", "fileRef": file_id}, f"{name} in Sources")
+    project.append_item(group.id, "children", file_id)
+    for phase_id in phases:
+        project.append_item(phase_id, "files", build_id)
+    return [f"Added: {name} to {group_name}"]
+
+def remove_file(project, name):
+    """Remove a file reference, its build files and every list entry naming them"""
+    ref = project.file_reference(name)
+    if ref is None:
+        return [f"Skipped: {name} is not in the project"]
+    for build_file in project.objects_of("PBXBuildFile"):
+        if build_file.fields.get("fileRef") == ref.id:
+            for phase in project.holders(build_file.id, BUILD_PHASE_ISAS, "files"):
+                project.remove_item(phase.id, "files", build_file.id)
+            project.remove_object(build_file.id)
+    for group in project.holders(ref.id, ("PBXGroup", "PBXVariantGroup"), "children"):
+        project.remove_item(group.id, "children", ref.id)
+    project.remove_object(ref.id)
+    return [f"Removed: {name}"]
+
+def move_file(project, name, group_name):
+    """Move a file reference into another group"""
+    ref = project.file_reference(name)
+    group = project.find_group(group_name)
+    if ref is None or group is None:
+        return [f"WARNING: Skipped moving {name}: no such file or no '{group_name}' group"]
+    for parent in project.holders(ref.id, ("PBXGroup", "PBXVariantGroup"), "children"):
+        project.remove_item(parent.id, "children", ref.id)
+    project.append_item(group.id, "children", ref.id)
+    return [f"Moved: {name} to {group_name}"]
+
+# Fields that name other objects, with the types they may name
+TARGET_ISAS = ("PBXNativeTarget", "PBXAggregateTarget", "PBXLegacyTarget")
+GROUP_ISAS = ("PBXGroup", "PBXVariantGroup", "XCVersionGroup")
+REFERENCE_FIELDS = {
+    "fileRef": ("PBXFileReference", "PBXReferenceProxy") + GROUP_ISAS,
+    "productRef": ("XCSwiftPackageProductDependency",),
+    "package": PACKAGE_ISAS,
+    "buildConfigurationList": ("XCConfigurationList",),
+    "buildConfigurations": ("XCBuildConfiguration",),
+    "mainGroup": ("PBXGroup",),
+    "productRefGroup": ("PBXGroup",),
+    "children": ("PBXFileReference", "PBXReferenceProxy") + GROUP_ISAS,
+    "targets": TARGET_ISAS,
+    "target": TARGET_ISAS,
+    "buildPhases": BUILD_PHASE_ISAS + ("PBXShellScriptBuildPhase",),
+    "files": ("PBXBuildFile",),
+    "dependencies": ("PBXTargetDependency",),
+    "targetProxy": ("PBXContainerItemProxy",),
+    "productReference": ("PBXFileReference",),
+    "packageReferences": PACKAGE_ISAS,
+    "packageProductDependencies": ("XCSwiftPackageProductDependency",),
+}
+
+def verify_project(project):
+    """Check the object graph; returns "ERROR: ..." and "WARNING: ..." messages
+
+    Errors are duplicate IDs and references to missing objects or to
+    objects of the wrong type. Warnings are build files in no build phase
+    and file references in no group.
+    """
+    messages = [f"ERROR: object {object_id} is defined more than once" for object_id in project.duplicates]
+    root = project.get(project.root_id)
+    if root is None or root.isa != "PBXProject":
+        messages.append(f"ERROR: rootObject {project.root_id} is not a PBXProject")
+    for obj in project.objects.values():
+        for field, allowed in REFERENCE_FIELDS.items():
+            value = obj.fields.get(field)
+            for target in [value] if isinstance(value, str) else value or ():
+                other = project.get(target)
+                if other is None:
+                    messages.append(f"ERROR: {obj.id} ({obj.comment or obj.isa}) {field} names missing object {target}")
+                elif other.isa not in allowed:
+                    messages.append(f"ERROR: {obj.id} ({obj.comment or obj.isa}) {field} names {target}, "
+                                    f"a {other.isa}")
+
+    referrers = project.reverse_index()
+    for build_file in project.objects_of("PBXBuildFile"):
+        if not any("files" in fields for fields in referrers.get(build_file.id, {}).values()):
+            messages.append(f"WARNING: build file {build_file.id} ({build_file.comment}) is in no build phase")
+    for ref in project.objects_of("PBXFileReference"):
+        if ref.fields.get("sourceTree") == "BUILT_PRODUCTS_DIR":
+            continue
+        if not any("children" in fields for fields in referrers.get(ref.id, {}).values()):
+            messages.append(f"WARNING: file reference {ref.id} ({ref.comment}) is in no group")
+    return messages
+
+def package_name(package):
+    """Return a package reference's name: its repository or folder name"""
+    location = package.fields.get("repositoryURL") or package.fields.get("relativePath") or ""
+    name = location.rstrip("/").rsplit("/", 1)[-1]
+    return name[:-len(".git")] if name.endswith(".git") else name
+
+def remove_package(project, name):
+    """Remove a Swift package and everything only it keeps alive; returns change messages"""
+    packages = [package.id for isa in PACKAGE_ISAS for package in project.objects_of(isa)
+                if package_name(package).lower() == name.lower()]
+    if not packages:
+        return [f"Skipped: no Swift package named {name}"]
+    collected, detached = project.collect(packages)
+    messages = [f"Collected: {obj.id} {obj.isa} ({obj.comment or obj.fields.get('productName') or 'unnamed'})"
+                for obj in collected]
+    messages.append(f"Removed {len(collected)} object(s) and {detached} reference(s) to them")
+    return messages
+
+def cache_path(cache_dir, data):
+    """Return where the parse of a project file's bytes is cached"""
+    return os.path.join(cache_dir, f"{hashlib.sha256(data).hexdigest()}-v{CACHE_VERSION}.pickle")
+
+def store_parse(cache_dir, data, project):
+    """Cache a freshly parsed project, pruning the oldest entries"""
+    os.makedirs(cache_dir, exist_ok=True)
+    path = cache_path(cache_dir, data)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(project, f, pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+    entries = sorted((entry for entry in os.scandir(cache_dir) if entry.name.endswith(".pickle")),
+                     key=lambda entry: entry.stat().st_mtime, reverse=True)
+    for entry in entries[CACHE_ENTRIES:]:
+        try:
+            os.remove(entry.path)
+        except OSError:
+            pass
+
+def load_project(path, cache_dir=None):
+    """Parse a project file, reusing a cached parse of identical content when cache_dir is given
+
+    Returns (project, hit). The cache is keyed by a SHA-256 of the file's
+    bytes, so any change to the file (or CACHE_VERSION) is a miss.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    count("pbxproj bytes read", len(data))
+    if cache_dir is not None:
+        try:
+            with span("pbxproj cache load"), open(cache_path(cache_dir, data), 'rb') as f:
+                project = pickle.load(f)
+            count("parse cache hits")
+            return project, True
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+            count("parse cache misses")
+    project = PBXProject(data.decode("utf-8"))
+    if cache_dir is not None:
+        with span("pbxproj cache store"):
+            store_parse(cache_dir, data, project)
+    return project, False
+
+# Outcome of a transaction on one project file: messages from every
+# operation, the unified diff of the change and whether it was written
+ProjectResult = namedtuple("ProjectResult", "path messages diff written cache_hit")
+
+class Transaction:
+    """A batch of edits applied to each project file in one parse/serialize pass
+
+    Operations are queued as functions of a PBXProject returning a list of
+    messages, so the same batch can run against several project files.
+    Nothing is written unless every operation on a project succeeds, and
+    each file is replaced atomically through a temp file.
+    """
+
+    def __init__(self, cache_dir=None):
+        self.operations = []
+        # Parse cache directory, or None to always parse
+        self.cache_dir = cache_dir
+
+    def queue(self, operation, *args):
+        """Queue operation(project, *args)"""
+        self.operations.append((operation, args))
+        return self
+
+    def add_file(self, name, group_name, file_id, build_id, target_name=None):
+        return self.queue(add_source_file, name, group_name, file_id, build_id, target_name)
+
+    def remove_file(self, name):
+        return self.queue(remove_file, name)
+
+    def move_file(self, name, group_name):
+        return self.queue(move_file, name, group_name)
+
+    def remove_package(self, name):
+        return self.queue(remove_package, name)
+
+    def apply(self, path, dry_run=False):
+        """Run every queued operation against one project file; returns a ProjectResult"""
+        project, hit = load_project(path, self.cache_dir)
+        messages = []
+        for operation, args in self.operations:
+            with span(operation.__name__):
+                messages.extend(operation(project, *args))
+        if not project.is_edited():
+            return ProjectResult(path, messages, "", False, hit)
+
+        with span("pbxproj serialize"):
+            text = project.serialize()
+        diff = "".join(difflib.unified_diff(project.text.splitlines(keepends=True),
+                                            text.splitlines(keepends=True), path, path))
+        if not dry_run:
+            project.save(path, text)
+            if self.cache_dir is not None:
+                # Parse what was written now, so the next run on it is a hit
+                store_parse(self.cache_dir, text.encode("utf-8"), PBXProject(text))
+        return ProjectResult(path, messages, diff, not dry_run, hit)
+
+    def commit(self, paths, dry_run=False, workers=None):
+        """Apply the batch to every project file; returns ProjectResults in order"""
+        return run_transactions([(self, path) for path in paths], dry_run, workers)
+
+def apply_job(job):
+    """Run one (transaction, path, dry_run) job; runs in a worker process when parallel"""
+    transaction, path, dry_run = job
+    return transaction.apply(path, dry_run)
+
+def run_transactions(jobs, dry_run=False, workers=None):
+    """Apply (transaction, path) jobs, across a process pool when there are several
+
+    Operations must be module-level functions so the transactions can be
+    sent to worker processes.
+    """
+    workers = min(len(jobs), workers or os.cpu_count() or 1)
+    tasks = [(transaction, path, dry_run) for transaction, path in jobs]
+    if workers <= 1:
+        return [apply_job(task) for task in tasks]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = []
+        for result, recording in pool.map(functools.partial(run_recorded, worker_origin(), apply_job), tasks):
+            merge_recording(recording)
+            results.append(result)
+        return results
+
+def find_projects(root):
+    """Return every project.pbxproj under root, skipping hidden and build directories"""
+    found = []
+    for dirpath, dirnames, _ in os.walk(root):
+        dirnames[:] = sorted(name for name in dirnames if not name.startswith(".") and name not in SKIPPED_DIRS)
+        for name in dirnames:
+            if name.endswith(".xcodeproj") and os.path.isfile(os.path.join(dirpath, name, "project.pbxproj")):
+                found.append(os.path.join(dirpath, name, "project.pbxproj"))
+    return found
+
+def print_results(results):
+    """Print each project's messages, plus its diff for dry runs"""
+    for result in results:
+        print(f"{result.path}:")
+        for message in result.messages:
+            print(f"  {message}")
+        if result.diff and not result.written:
+            print(result.diff, end="")
+        elif not result.diff:
+            print("  No changes")
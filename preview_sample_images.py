@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Sample Image Preview Server
+Renders style samples on demand at /sample/<style_key>?size=720&seed=3 for
+designers iterating on STYLES, caching recent renders and picking up edits
+to the style definitions without a restart
+"""
+
+import argparse
+import hashlib
+import html
+import importlib
+import io
+import os
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import generate_sample_images as generator
+import sample_textures
+from instrumentation import add_profile_arguments, count, profiling, span
+
+# Modules whose edits change what a sample looks like; texture code first,
+# since the generator imports from it
+WATCHED_MODULES = (sample_textures, generator)
+
+# Accepted query parameter ranges; several styles draw shapes at fixed
+# offsets from the edges and need at least 160 pixels. MAX_PIXELS caps the
+# rendered width (size times scale), which is held in memory while encoding
+MIN_SIZE, MAX_PIXELS = 160, 2048
+SCALES = (1, 2, 3)
+
+# Encodings a sample can be served in, with their content types
+PREVIEW_FORMATS = {"png": ("PNG", "image/png"), "jpeg": ("JPEG", "image/jpeg"), "webp": ("WEBP", "image/webp")}
+
+class RenderCache:
+    """Encoded samples keyed by their parameters, least recently used first
+
+    Holds at most max_bytes of image data. Every entry is dropped when a
+    watched source file changes on disk, after the changed modules have
+    been reloaded.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        # Bumped on every reload, so clients can tell their samples are stale
+        self.generation = 0
+        self.stamps = self.source_stamps()
+        self.reload_error = None
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def source_stamps():
+        return [os.stat(module.__file__).st_mtime_ns for module in WATCHED_MODULES]
+
+    def check_sources(self):
+        """Reload the style definitions and empty the cache if a watched file changed"""
+        stamps = self.source_stamps()
+        with self.lock:
+            if stamps == self.stamps:
+                return
+            self.stamps = stamps
+            try:
+                with span("reload styles"):
+                    for module in WATCHED_MODULES:
+                        importlib.reload(module)
+                self.reload_error = None
+            except Exception as e:
+                # Keep serving the last good definitions until the file is fixed
+                self.reload_error = f"{type(e).__name__}: {e}"
+                print(f"WARNING: Could not reload the style definitions: {self.reload_error}")
+                return
+            self.entries.clear()
+            self.size = 0
+            self.generation += 1
+            print(f"Style definitions changed; cache cleared (generation {self.generation})")
+
+    def get(self, key):
+        with self.lock:
+            data = self.entries.get(key)
+            if data is not None:
+                self.entries.move_to_end(key)
+            return data
+
+    def put(self, key, data, generation):
+        """Store a render unless the definitions were reloaded while it was being made"""
+        with self.lock:
+            if generation != self.generation or len(data) > self.max_bytes:
+                return
+            if key in self.entries:
+                self.size -= len(self.entries.pop(key))
+            self.entries[key] = data
+            self.size += len(data)
+            while self.size > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+                count("preview cache evictions")
+
+def parse_sample_query(query):
+    """Return (size, seed, scale, format) from a /sample query string; raises ValueError"""
+    params = {name: values[-1] for name, values in parse_qs(query).items()}
+    size = int(params.get("size", 360))
+    scale = int(params.get("scale", 1))
+    fmt = params.get("format", "png").lower()
+    if scale not in SCALES:
+        raise ValueError(f"scale must be one of {', '.join(map(str, SCALES))}")
+    if not MIN_SIZE <= size <= MAX_PIXELS // scale:
+        raise ValueError(f"size must be between {MIN_SIZE} and {MAX_PIXELS // scale} at scale {scale}")
+    if fmt not in PREVIEW_FORMATS:
+        raise ValueError(f"format must be one of {', '.join(PREVIEW_FORMATS)}")
+    seed = int(params["seed"]) if "seed" in params else None
+    return size, seed, scale, fmt
+
+def render_sample(style_key, size, seed, scale, fmt):
+    """Render and encode one sample with the currently loaded style definitions"""
+    style_info = generator.STYLES[style_key]
+    if seed is None:
+        seed = generator.style_seed(style_key)
+    img = generator.create_sample_image(style_key, style_info, (size, size), seed, scale)
+    buffer = io.BytesIO()
+    with span("preview encode", format=fmt):
+        if fmt == "png":
+            img.save(buffer, "PNG")
+        else:
+            img.save(buffer, PREVIEW_FORMATS[fmt][0], quality=generator.ENCODER_SETTINGS["quality"])
+    return buffer.getvalue()
+
+def index_page(generation):
+    """Return the HTML page showing every style, reloading itself when the definitions change"""
+    cards = "\n".join(
+        f'<figure><img src="/sample/{key}?size=360&amp;v={generation}" width="360" height="360">'
+        f'<figcaption>{html.escape(info["name"])} <code>{key}</code></figcaption></figure>'
+        for key, info in generator.STYLES.items())
+    return f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>VividAI style samples</title>
+<style>body{{font-family:-apple-system,sans-serif;background:#111;color:#eee}}
+figure{{display:inline-block;margin:8px}}code{{color:#999}}</style></head>
+<body><h1>VividAI style samples</h1>
+{cards}
+<script>
+setInterval(async () => {{
+  const response = await fetch("/generation");
+  if ((await response.text()).trim() !== "{generation}") location.reload();
+}}, 1000);
+</script></body></html>
+"""
+
+class PreviewHandler(BaseHTTPRequestHandler):
+    """Serve the index page, the cache generation and rendered samples"""
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def send_body(self, status, content_type, body, headers=()):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-cache")
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_text(self, status, text):
+        self.send_body(status, "text/plain; charset=utf-8", (text + "\n").encode("utf-8"))
+
+    def do_GET(self):
+        cache = self.server.cache
+        cache.check_sources()
+        url = urlparse(self.path)
+        with span("preview request", path=url.path):
+            if url.path == "/":
+                self.send_body(200, "text/html; charset=utf-8", index_page(cache.generation).encode("utf-8"))
+            elif url.path == "/generation":
+                self.send_text(200, str(cache.generation))
+            elif url.path.startswith("/sample/"):
+                self.serve_sample(cache, url.path[len("/sample/"):], url.query)
+            else:
+                self.send_text(404, f"Not found: {url.path}")
+
+    def serve_sample(self, cache, style_key, query):
+        if cache.reload_error:
+            self.send_text(500, f"Style definitions failed to load: {cache.reload_error}")
+            return
+        if style_key not in generator.STYLES:
+            self.send_text(404, f"Unknown style {style_key}; try one of: {', '.join(generator.STYLES)}")
+            return
+        try:
+            size, seed, scale, fmt = parse_sample_query(query)
+        except ValueError as e:
+            self.send_text(400, str(e))
+            return
+
+        generation = cache.generation
+        key = (style_key, size, seed, scale, fmt)
+        etag = '"' + hashlib.sha1(repr((generation, key)).encode("utf-8")).hexdigest() + '"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        data = cache.get(key)
+        state = "hit"
+        if data is None:
+            state = "miss"
+            try:
+                data = render_sample(style_key, size, seed, scale, fmt)
+            except Exception as e:
+                # An edit to the definitions can still fail at render time
+                self.send_text(500, f"Could not render {style_key}: {type(e).__name__}: {e}")
+                return
+            cache.put(key, data, generation)
+        count(f"preview cache {state}s")
+        self.send_body(200, PREVIEW_FORMATS[fmt][1], data, [("ETag", etag), ("X-Preview-Cache", state)])
+
+def parse_args(argv=None):
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Serve VividAI style samples rendered on demand")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8000, help="port to listen on (default: 8000)")
+    parser.add_argument("--cache-mb", type=float, default=64,
+                        help="megabytes of encoded samples to keep (default: 64)")
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    add_profile_arguments(parser)
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    """Serve previews until interrupted"""
+    args = parse_args(argv)
+    server = ThreadingHTTPServer((args.host, args.port), PreviewHandler)
+    server.daemon_threads = True
+    server.cache = RenderCache(int(args.cache_mb * 2**20))
+    server.verbose = args.verbose
+    print(f"Previewing {len(generator.STYLES)} styles at http://{args.host}:{server.server_port}/")
+    print(f"Samples: http://{args.host}:{server.server_port}/sample/<style_key>?size=720&seed=3 "
+          f"(also scale=1-3, format={'/'.join(PREVIEW_FORMATS)})")
+    print(f"Watching {', '.join(os.path.basename(module.__file__) for module in WATCHED_MODULES)} for changes")
+    with profiling(args.profile, args.cprofile):
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Xcode Project Tool
+Adds, removes, syncs and verifies files across the VividAI Xcode projects
+from one entry point, reusing parsed projects between runs
+"""
+
+import argparse
+import os
+import sys
+
+from add_files_to_project import REPO_ROOT, SYNC_EXCLUDE, register_missing_files, sync_projects
+from instrumentation import add_profile_arguments, profiling
+from pbxproj import Transaction, find_projects, print_results, verify_project
+
+# Parsed projects keyed by content hash, shared by every run of the tool
+PARSE_CACHE_DIR = os.path.join(REPO_ROOT, ".pbxproj_cache")
+
+def print_cache_summary(results):
+    """Print how many projects were loaded from the parse cache"""
+    hits = sum(1 for result in results if result.cache_hit)
+    print(f"Parse cache: {hits} hit(s), {len(results) - hits} miss(es)")
+
+def command_add(args, projects, cache_dir):
+    """Register the given Swift files (paths relative to each project's folder)"""
+    transaction = Transaction(cache_dir).queue(register_missing_files, [os.path.normpath(path) for path in args.files])
+    results = transaction.commit(projects, args.dry_run, args.workers)
+    print_results(results)
+    print_cache_summary(results)
+    return 0
+
+def command_remove(args, projects, cache_dir):
+    """Remove files by name and Swift packages by repository name"""
+    transaction = Transaction(cache_dir)
+    for name in args.files:
+        transaction.remove_file(name)
+    for name in args.package or []:
+        transaction.remove_package(name)
+    results = transaction.commit(projects, args.dry_run, args.workers)
+    print_results(results)
+    print_cache_summary(results)
+    return 0
+
+def command_sync(args, projects, cache_dir):
+    """Register every Swift file under --source-dir that a project is missing"""
+    results = sync_projects(projects, args.source_dir, args.exclude or SYNC_EXCLUDE, args.dry_run,
+                            parse_cache_dir=cache_dir, workers=args.workers)
+    if results:
+        print_cache_summary(results)
+    return 0
+
+def command_verify(args, projects, cache_dir):
+    """Check every project's object graph; exits 1 when any project has errors"""
+    results = Transaction(cache_dir).queue(verify_project).commit(projects, workers=args.workers)
+    errors = 0
+    for result in results:
+        print(f"{result.path}:")
+        for message in result.messages:
+            print(f"  {message}")
+        if not result.messages:
+            print("  OK")
+        errors += sum(1 for message in result.messages if message.startswith("ERROR"))
+    print_cache_summary(results)
+    if errors:
+        print(f"ERROR: {errors} problem(s) found")
+        return 1
+    print(f"SUCCESS: {len(results)} project file(s) verified")
+    return 0
+
+def parse_args(argv=None):
+    """Parse command line options"""
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--project", action="append", metavar="PBXPROJ",
+                        help="project.pbxproj to work on; repeatable (default: every project in the repo)")
+    common.add_argument("--dry-run", action="store_true",
+                        help="print a unified diff of the changes instead of writing them")
+    common.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="worker processes across project files (default: CPU count)")
+    common.add_argument("--cache-dir", default=PARSE_CACHE_DIR,
+                        help="parse cache directory (default: .pbxproj_cache next to this script)")
+    common.add_argument("--no-cache", action="store_true",
+                        help="always parse project files instead of using the parse cache")
+    add_profile_arguments(common)
+
+    parser = argparse.ArgumentParser(description="Edit and check the VividAI Xcode projects")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    add = commands.add_parser("add", parents=[common], help="register Swift files in their groups and Sources")
+    add.add_argument("files", nargs="+", metavar="PATH",
+                     help="Swift file relative to the .xcodeproj's folder, e.g. VividAI/Views/HomeView.swift")
+    add.set_defaults(run=command_add)
+
+    remove = commands.add_parser("remove", parents=[common], help="remove files and Swift packages")
+    remove.add_argument("files", nargs="*", metavar="NAME", help="file name to remove, e.g. HomeView.swift")
+    remove.add_argument("--package", action="append", metavar="NAME",
+                        help="Swift package to remove with everything only it uses; repeatable")
+    remove.set_defaults(run=command_remove)
+
+    sync = commands.add_parser("sync", parents=[common], help="register Swift files missing from the projects")
+    sync.add_argument("--source-dir", default="VividAI",
+                      help="directory to walk, relative to each .xcodeproj's folder (default: VividAI)")
+    sync.add_argument("--exclude", action="append", metavar="GLOB",
+                      help="file name pattern to skip; repeatable (default: test_*.swift, *Tests.swift)")
+    sync.set_defaults(run=command_sync)
+
+    verify = commands.add_parser("verify", parents=[common], help="check for dangling and mistyped references")
+    verify.set_defaults(run=command_verify)
+
+    args = parser.parse_args(argv)
+    if args.command == "remove" and not args.files and not args.package:
+        parser.error("remove needs at least one file name or --package")
+    return args
+
+def main(argv=None):
+    """Run one subcommand against the selected project files"""
+    args = parse_args(argv)
+    projects = args.project or find_projects(REPO_ROOT)
+    cache_dir = None if args.no_cache else args.cache_dir
+    with profiling(args.profile, args.cprofile):
+        try:
+            status = args.run(args, projects, cache_dir)
+        except Exception as e:
+            print(f"ERROR: {args.command} failed: {e}")
+            status = 1
+    sys.exit(status)
+
+if __name__ == "__main__":
+    main()
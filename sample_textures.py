@@ -0,0 +1,420 @@
+#!/usr/bin/env python3
+"""
+Procedural Texture Engine
+Vectorized NumPy textures for the artistic VividAI sample image styles
+
+Every texture is built as whole-canvas float32 arrays and converted to a PIL
+image once. Full-size temporaries are the main cost at print resolutions, so
+the helpers work in place and keep anything that only varies along one axis
+as an (h, 1) or (1, w) array that broadcasts.
+
+Helpers take a Region rather than a size, so the same code renders either the
+whole canvas or any tile of it; a tile holds exactly the pixels the whole
+canvas render has at that position.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+from PIL import Image
+
+# The part of a canvas being rendered: the full canvas size in pixels plus
+# the pixel origin and size of the window inside it
+Region = namedtuple("Region", "canvas_width canvas_height left top width height")
+
+def full_region(size):
+    """Return the Region covering a whole (width, height) canvas"""
+    return Region(size[0], size[1], 0, 0, size[0], size[1])
+
+def to_color(rgb):
+    """Convert an (r, g, b) tuple into a float32 color vector"""
+    return np.asarray(rgb, dtype=np.float32)
+
+def mix(a, b, t):
+    """Linearly interpolate between two colors"""
+    return a + (b - a) * t
+
+def smoothstep(edge0, edge1, x):
+    """Hermite step from 0 at edge0 to 1 at edge1, returned as a new array"""
+    t = np.subtract(x, np.float32(edge0), dtype=np.float32)
+    t *= np.float32(1.0 / (edge1 - edge0))
+    np.clip(t, 0.0, 1.0, out=t)
+    result = t * np.float32(-2.0)
+    result += np.float32(3.0)
+    result *= t
+    result *= t
+    return result
+
+def pixel_grid(region):
+    """Return (yy, xx) canvas pixel-center coordinates that broadcast to (h, w)"""
+    xx = np.arange(region.left, region.left + region.width, dtype=np.float32) + np.float32(0.5)
+    yy = np.arange(region.top, region.top + region.height, dtype=np.float32) + np.float32(0.5)
+    return yy[:, None], xx[None, :]
+
+def coordinate_grid(region):
+    """Return normalized (yy, xx) pixel-center coordinates that broadcast to (h, w)"""
+    yy, xx = pixel_grid(region)
+    return yy / np.float32(region.canvas_height), xx / np.float32(region.canvas_width)
+
+def fill(region, color):
+    """Return an (h, w, 3) canvas filled with a solid color"""
+    canvas = np.empty((region.height, region.width, 3), dtype=np.float32)
+    canvas[...] = to_color(color)
+    return canvas
+
+def gradient(region, t, start, end):
+    """Return an (h, w, 3) canvas blending start to end by a broadcastable t field"""
+    start = to_color(start)
+    canvas = np.empty((region.height, region.width, 3), dtype=np.float32)
+    np.multiply(t[..., None], to_color(end) - start, out=canvas)
+    canvas += start
+    return canvas
+
+def linear_gradient(region, start, end, angle=90.0):
+    """Return a canvas blending start to end along angle (degrees, 0 = left to right)"""
+    yy, xx = coordinate_grid(region)
+    theta = np.radians(angle)
+    cos_t, sin_t = np.float32(np.cos(theta)), np.float32(np.sin(theta))
+    # Normalize against the canvas corners so t spans exactly [0, 1]
+    corners = [x * cos_t + y * sin_t for x in (0.0, 1.0) for y in (0.0, 1.0)]
+    low, high = min(corners), max(corners)
+    scale = np.float32(1.0 / (high - low))
+    t = (xx * (cos_t * scale) - low * scale) + yy * (sin_t * scale)
+    return gradient(region, t, start, end)
+
+def radial_gradient(region, inner, outer, center=(0.5, 0.5), radius=0.75):
+    """Return a canvas blending inner at center to outer at radius (normalized units)"""
+    yy, xx = coordinate_grid(region)
+    t = np.square(xx - np.float32(center[0])) + np.square(yy - np.float32(center[1]))
+    np.sqrt(t, out=t)
+    t *= np.float32(1.0 / radius)
+    np.clip(t, 0.0, 1.0, out=t)
+    return gradient(region, t, inner, outer)
+
+def lattice_position(pixels, cells, start=0, count=None):
+    """Return (index, t): each pixel's lattice cell and smoothed offset within it
+
+    pixels is the canvas extent along the axis and start/count select the
+    window being rendered.
+    """
+    count = pixels - start if count is None else count
+    position = (np.arange(start, start + count, dtype=np.float32) + np.float32(0.5)) * np.float32(cells / pixels)
+    index = np.minimum(position.astype(np.intp), cells - 1)
+    return index, smoothstep(0.0, 1.0, position - index.astype(np.float32))
+
+def lattice_hash(key, rows, columns):
+    """Return [0, 1) lattice values hashed from key and integer lattice coordinates
+
+    Any window of the lattice can be computed on its own, so a tile only
+    builds the lattice points it needs.
+    """
+    h = (rows.astype(np.uint32) * np.uint32(0x9E3779B1)) ^ (columns.astype(np.uint32) * np.uint32(0x85EBCA77))
+    h ^= np.uint32(key)
+    h ^= h >> np.uint32(16)
+    h *= np.uint32(0x7FEB352D)
+    h ^= h >> np.uint32(15)
+    h *= np.uint32(0x846CA68B)
+    h ^= h >> np.uint32(16)
+    return (h >> np.uint32(8)).astype(np.float32) * np.float32(2.0 ** -24)
+
+def fractal_noise(region, rng, cells=(3, 3), octaves=4, persistence=0.5):
+    """Return [0, 1] fractal (fBm) noise built from octaves of value noise
+
+    The lattice is sampled at normalized coordinates, so every canvas size
+    shows the same pattern for the same rng state. Each octave is smoothed
+    along x on its small lattice, then interpolated along y and added to the
+    sum. Every pixel goes through the same elementwise operations however
+    the canvas is split into regions, so tiles match the full render exactly.
+    """
+    noise = np.zeros((region.height, region.width), dtype=np.float32)
+    amplitude = 1.0
+    norm = 0.0
+    for octave in range(octaves):
+        cells_x, cells_y = cells[0] * 2 ** octave, cells[1] * 2 ** octave
+        lattice = rng.random((cells_y + 1, cells_x + 1), dtype=np.float32)
+        lattice *= np.float32(amplitude)
+        index_x, t_x = lattice_position(region.canvas_width, cells_x, region.left, region.width)
+        index_y, t_y = lattice_position(region.canvas_height, cells_y, region.top, region.height)
+        rows = lattice[:, index_x + 1] - lattice[:, index_x]
+        rows *= t_x
+        rows += lattice[:, index_x]
+        steps = rows[1:] - rows[:-1]
+        octave_noise = steps[index_y]
+        octave_noise *= t_y[:, None]
+        octave_noise += rows[index_y]
+        noise += octave_noise
+        norm += amplitude
+        amplitude *= persistence
+    noise *= np.float32(1.0 / norm)
+    return noise
+
+def value_noise(region, rng, cells=(4, 4)):
+    """Return smooth [0, 1] value noise with cells lattice cells across each axis
+
+    Unlike fractal_noise the lattice is hashed rather than drawn from rng, and
+    only the window under region is built, so fine lattices such as paper
+    grain cost memory in proportion to the region rather than the canvas.
+    """
+    cells_x, cells_y = cells
+    key = rng.integers(0, 2 ** 32, dtype=np.uint32)
+    index_x, t_x = lattice_position(region.canvas_width, cells_x, region.left, region.width)
+    index_y, t_y = lattice_position(region.canvas_height, cells_y, region.top, region.height)
+    first_x, first_y = index_x[0], index_y[0]
+    lattice = lattice_hash(key, np.arange(first_y, index_y[-1] + 2)[:, None],
+                           np.arange(first_x, index_x[-1] + 2)[None, :])
+
+    # Interpolate along x with two gathers, then along y between lattice rows
+    index_x -= first_x
+    rows = lattice[:, index_x + 1] - lattice[:, index_x]
+    rows *= t_x
+    rows += lattice[:, index_x]
+    steps = rows[1:] - rows[:-1]
+
+    index_y -= first_y
+    noise = steps[index_y]
+    noise *= t_y[:, None]
+    noise += rows[index_y]
+    return noise
+
+def paper_grain(region, rng, scale):
+    """Return fine [0, 1] grain with roughly two layout points per lattice cell"""
+    cells = (max(1, region.canvas_width // (2 * scale)), max(1, region.canvas_height // (2 * scale)))
+    return value_noise(region, rng, cells)
+
+def hatch_mask(region, spacing, angle, thickness):
+    """Return an antialiased [0, 1] mask of parallel lines, measured in pixels"""
+    yy, xx = pixel_grid(region)
+    theta = np.radians(angle)
+    distance = xx * np.float32(np.cos(theta)) + yy * np.float32(np.sin(theta))
+    np.mod(distance, np.float32(spacing), out=distance)
+    distance -= np.float32(spacing / 2)
+    np.abs(distance, out=distance)
+    np.subtract(np.float32(thickness / 2 + 0.5), distance, out=distance)
+    np.clip(distance, 0.0, 1.0, out=distance)
+    return distance
+
+def halftone_mask(region, spacing, radius, angle=45.0):
+    """Return an antialiased [0, 1] mask of halftone dots on a rotated grid
+
+    radius is the dot radius in pixels, either a scalar or an (h, w) field
+    so dot size can follow a tone gradient.
+    """
+    yy, xx = pixel_grid(region)
+    theta = np.radians(angle)
+    cos_t, sin_t = np.float32(np.cos(theta)), np.float32(np.sin(theta))
+    half = np.float32(spacing / 2)
+    u = xx * cos_t + yy * sin_t
+    v = yy * cos_t - xx * sin_t
+    for axis in (u, v):
+        np.mod(axis, np.float32(spacing), out=axis)
+        axis -= half
+        np.square(axis, out=axis)
+    u += v
+    np.sqrt(u, out=u)
+    np.subtract(radius + np.float32(0.5), u, out=u)
+    np.clip(u, 0.0, 1.0, out=u)
+    return u
+
+def blend(canvas, color, mask):
+    """Paint color over canvas in place, weighted by a broadcastable (h, w) mask"""
+    color = to_color(color)
+    keep = np.float32(1.0) - mask
+    canvas -= color
+    canvas *= keep[..., None]
+    canvas += color
+    return canvas
+
+def shade(canvas, factor):
+    """Multiply canvas in place by a broadcastable (h, w) brightness factor"""
+    canvas *= factor[..., None]
+    return canvas
+
+def static_layer(layers, name, build):
+    """Return layers[name], building it first if needed; layers may be None
+
+    Static layers never touch the rng, so they can be shared between variants
+    of a style that differ only in seed. Callers must copy a cached canvas
+    before painting over it.
+    """
+    if layers is None:
+        return build()
+    if name not in layers:
+        layers[name] = build()
+    return layers[name]
+
+def to_image(canvas):
+    """Quantize a float canvas into an 8-bit RGB PIL image"""
+    np.clip(canvas, 0.0, 254.5, out=canvas)
+    canvas += np.float32(0.5)
+    return Image.fromarray(canvas.astype(np.uint8), 'RGB')
+
+def painterly_texture(style_info, region, scale, rng, layers=None):
+    """Renaissance/oil: warm vignette, horizontal brush streaks and canvas weave"""
+    bg = to_color(style_info['bg_color'])
+    canvas = static_layer(layers, "vignette", lambda: radial_gradient(
+        region, mix(bg, 255.0, 0.12), bg * 0.65, radius=0.8)).copy()
+
+    streaks = fractal_noise(region, rng, cells=(2, 18), octaves=3)
+    mask = smoothstep(0.45, 0.9, streaks)
+    mask *= np.float32(0.55)
+    blend(canvas, style_info['accent_color'], mask)
+
+    glaze = fractal_noise(region, rng, cells=(3, 3), octaves=3)
+    mask = smoothstep(0.6, 0.85, glaze)
+    mask *= np.float32(0.35)
+    blend(canvas, style_info['text_color'], mask)
+
+    grain = paper_grain(region, rng, scale)
+    grain *= np.float32(0.16)
+    grain += np.float32(0.9)
+    return shade(canvas, grain)
+
+def cyberpunk_scene(style_info, region):
+    """Static part of the cyberpunk texture: dusk sky, neon grid and horizon glow"""
+    bg = to_color(style_info['bg_color'])
+    accent = to_color(style_info['accent_color'])
+    yy, xx = coordinate_grid(region)
+    horizon = np.float32(0.55)
+    canvas = gradient(region, yy, bg * 0.4, mix(bg, accent, 0.25))
+
+    # Ground plane: rows evenly spaced in depth, columns converging on the horizon
+    depth = np.maximum(yy - horizon, 0.0) / (1.0 - horizon)
+    inverse = 1.0 / np.maximum(depth, np.float32(1e-3))
+    rows = smoothstep(0.44, 0.5, np.abs(np.mod(inverse * 2.0, 1.0) - 0.5))
+    fade = smoothstep(0.0, 0.3, depth)
+    columns = (xx - np.float32(0.5)) * (inverse * np.float32(6.0))
+    np.mod(columns, np.float32(1.0), out=columns)
+    columns -= np.float32(0.5)
+    np.abs(columns, out=columns)
+    grid = smoothstep(0.45, 0.5, columns)
+    np.maximum(grid, rows, out=grid)
+    grid *= fade * np.float32(0.85)
+    blend(canvas, accent, grid)
+
+    glow = np.exp(-np.square((yy - horizon) / np.float32(0.02)))
+    blend(canvas, style_info['text_color'], glow * np.float32(0.8))
+    return canvas
+
+def cyberpunk_texture(style_info, region, scale, rng, layers=None):
+    """Cyberpunk: dusk gradient, neon perspective grid, horizon glow and scanlines"""
+    bg = to_color(style_info['bg_color'])
+    yy, _ = coordinate_grid(region)
+    horizon = np.float32(0.55)
+    canvas = static_layer(layers, "scene", lambda: cyberpunk_scene(style_info, region)).copy()
+
+    # Skyline: noisy silhouette bands standing on the horizon
+    haze = fractal_noise(region, rng, cells=(24, 2), octaves=2)
+    haze *= np.float32(-0.25)
+    haze += horizon
+    skyline = ((yy > haze) & (yy < horizon)).astype(np.float32)
+    skyline *= np.float32(0.9)
+    blend(canvas, bg * 0.25, skyline)
+
+    pixel_yy, _ = pixel_grid(region)
+    scanlines = np.mod(pixel_yy // scale, 3) == 0
+    return shade(canvas, np.where(scanlines, np.float32(0.82), np.float32(1.0)))
+
+def abstract_texture(style_info, region, scale, rng, layers=None):
+    """Abstract: diagonal gradient under marbled bands of the accent colors"""
+    bg = to_color(style_info['bg_color'])
+    accent = to_color(style_info['accent_color'])
+    canvas = static_layer(layers, "gradient", lambda: linear_gradient(
+        region, bg, mix(bg, accent, 0.35), angle=35.0)).copy()
+
+    bands = fractal_noise(region, rng, cells=(2, 2), octaves=4)
+    bands *= np.float32(6.0 * np.pi)
+    np.sin(bands, out=bands)
+    mask = smoothstep(0.5, 0.9, bands)
+    mask *= np.float32(0.8)
+    blend(canvas, accent, mask)
+
+    veins = fractal_noise(region, rng, cells=(3, 3), octaves=3)
+    mask = smoothstep(0.62, 0.7, veins)
+    mask *= np.float32(0.6)
+    blend(canvas, style_info['text_color'], mask)
+    return canvas
+
+def watercolor_texture(style_info, region, scale, rng, layers=None):
+    """Watercolor: pigment washes with darker pooled edges on grainy paper"""
+    canvas = fill(region, style_info['bg_color'])
+
+    for color, strength in ((style_info['accent_color'], 0.5), (style_info['text_color'], 0.35)):
+        field = fractal_noise(region, rng, cells=(3, 3), octaves=4)
+        # Pigment pools at the wash boundary: outer rim minus its inner core
+        wash = smoothstep(0.5, 0.62, field)
+        edge = smoothstep(0.52, 0.58, field)
+        np.subtract(wash, edge, out=edge)
+        edge *= np.float32(0.4)
+        wash *= np.float32(strength)
+        wash += edge
+        np.clip(wash, 0.0, 1.0, out=wash)
+        blend(canvas, color, wash)
+
+    grain = paper_grain(region, rng, scale)
+    grain *= np.float32(0.1)
+    grain += np.float32(0.93)
+    return shade(canvas, grain)
+
+def sketch_texture(style_info, region, scale, rng, layers=None):
+    """Sketch: tonal cross-hatching in pencil over paper"""
+    canvas = fill(region, style_info['bg_color'])
+    tone = fractal_noise(region, rng, cells=(3, 3), octaves=3)
+    grain = paper_grain(region, rng, scale)
+
+    light = static_layer(layers, "hatch_light", lambda: hatch_mask(region, 6 * scale, 45.0, scale))
+    dark = static_layer(layers, "hatch_dark", lambda: hatch_mask(region, 6 * scale, -45.0, scale))
+    strokes = light * smoothstep(0.4, 0.5, tone)
+    dark = dark * smoothstep(0.55, 0.65, tone)
+    np.maximum(strokes, dark, out=strokes)
+    # Pencil pressure varies with the paper tooth
+    strokes *= grain * np.float32(0.36) + np.float32(0.44)
+    blend(canvas, style_info['text_color'], strokes)
+
+    grain *= np.float32(0.05)
+    grain += np.float32(0.95)
+    return shade(canvas, grain)
+
+def pop_art_texture(style_info, region, scale, rng, layers=None):
+    """Pop art: Ben-Day halftone dots growing toward a seeded corner on a seeded screen angle"""
+    canvas = fill(region, style_info['bg_color'])
+    spacing = 12 * scale
+    yy, xx = coordinate_grid(region)
+    flip_x, flip_y = rng.integers(0, 2, size=2)
+    if flip_x:
+        xx = np.float32(1.0) - xx
+    if flip_y:
+        yy = np.float32(1.0) - yy
+    radius = (xx + yy) * np.float32(0.85 * spacing / 4)
+    radius += np.float32(0.15 * spacing / 2)
+    angle = rng.uniform(30.0, 60.0)
+    blend(canvas, style_info['accent_color'], halftone_mask(region, spacing, radius, angle))
+    return canvas
+
+# Style key fragments mapped to their texture, matched in order like the
+# branches in create_sample_image
+TEXTURES = (
+    ("renaissance", painterly_texture),
+    ("oil", painterly_texture),
+    ("cyberpunk", cyberpunk_texture),
+    ("abstract", abstract_texture),
+    ("watercolor", watercolor_texture),
+    ("sketch", sketch_texture),
+    ("pop", pop_art_texture),
+)
+
+def render_texture(style_key, style_info, size, scale, seed, layers=None, region=None):
+    """Render a style's background texture as a PIL image, or None if it has none
+
+    size is in pixels and scale is pixels per layout point, used for features
+    such as hatch spacing that are specified in points. Every call draws from
+    its own rng seeded with seed; layers optionally caches the seed-independent
+    layers between calls for the same style, size and scale. region renders a
+    single tile of the canvas instead of the whole of it; every tile draws the
+    same noise lattices, so tiles join up seamlessly.
+    """
+    for fragment, texture in TEXTURES:
+        if fragment in style_key:
+            rng = np.random.default_rng(seed)
+            region = full_region(size) if region is None else region
+            return to_image(texture(style_info, region, scale, rng, layers))
+    return None
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+GitHub API Stub Server
+Serves responses recorded with check_workflow_status.py --record so the
+workflow scripts can be run and timed offline. A logs archive is served
+from a .zip next to where its JSON fixture would be
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from github_actions import fixture_name
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    """Answer GETs from the fixture directory, honouring If-None-Match"""
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def send_json(self, status, body, headers=()):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_file(self, path):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/zip")
+        self.send_header("Content-Length", str(os.path.getsize(path)))
+        self.end_headers()
+        with open(path, 'rb') as f:
+            shutil.copyfileobj(f, self.wfile)
+
+    def do_GET(self):
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        archive = os.path.join(self.server.fixtures, os.path.splitext(fixture_name(self.path))[0] + ".zip")
+        if os.path.isfile(archive):
+            self.send_file(archive)
+            return
+        try:
+            with open(os.path.join(self.server.fixtures, fixture_name(self.path)), 'r') as f:
+                fixture = json.load(f)
+        except OSError:
+            self.send_json(404, {"message": "Not Found", "path": self.path})
+            return
+
+        body = json.dumps(fixture["body"], sort_keys=True).encode("utf-8")
+        etag = f'"{hashlib.sha1(body).hexdigest()}"'
+        headers = [("ETag", etag), ("X-RateLimit-Limit", "5000"), ("X-RateLimit-Remaining", "4999")]
+        if fixture.get("next"):
+            headers.append(("Link", f'<http://{self.headers["Host"]}{fixture["next"]}>; rel="next"'))
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            for name, value in headers:
+                self.send_header(name, value)
+            self.end_headers()
+            return
+        self.send_json(200, fixture["body"], headers)
+
+def parse_args(argv=None):
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Serve recorded GitHub API fixtures on localhost")
+    parser.add_argument("fixtures", help="directory written by check_workflow_status.py --record")
+    parser.add_argument("--port", type=int, default=8765, help="port to listen on (default: 8765)")
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="seconds to delay every response, to mimic the real API (default: 0)")
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    args = parse_args()
+    if not os.path.isdir(args.fixtures):
+        print(f"ERROR: No fixture directory at {args.fixtures}")
+        sys.exit(1)
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), FixtureHandler)
+    server.fixtures = args.fixtures
+    server.latency = args.latency
+    server.verbose = args.verbose
+    print(f"Serving {args.fixtures} at http://127.0.0.1:{args.port} (set --api-url to this)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
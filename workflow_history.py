@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Workflow Run History
+Keeps fetched workflow runs, jobs and steps in a local SQLite database and
+reports build duration percentiles and regressions from it
+"""
+
+import os
+import sqlite3
+from datetime import datetime, timedelta, timezone
+
+from github_actions import GitHubError
+from workflow_timings import DEFAULT_WORKERS, fetch_jobs, format_duration, parse_time, seconds_between, workflow_file
+
+# Directory holding the scripts and their caches
+REPO_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# History database used by default (gitignored)
+HISTORY_DB = os.path.join(REPO_ROOT, ".workflow_history.sqlite")
+
+# Timestamps are stored as API-style UTC strings, which sort chronologically
+TIME_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    workflow TEXT NOT NULL,
+    name TEXT,
+    run_number INTEGER,
+    branch TEXT,
+    event TEXT,
+    status TEXT,
+    conclusion TEXT,
+    created_at TEXT NOT NULL,
+    run_started_at TEXT,
+    updated_at TEXT,
+    duration REAL,
+    html_url TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_workflow ON runs (workflow, created_at);
+CREATE INDEX IF NOT EXISTS runs_branch ON runs (branch, created_at);
+CREATE INDEX IF NOT EXISTS runs_created ON runs (created_at);
+CREATE INDEX IF NOT EXISTS runs_incomplete ON runs (created_at) WHERE status != 'completed';
+
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    run_id INTEGER NOT NULL REFERENCES runs (id),
+    name TEXT,
+    status TEXT,
+    conclusion TEXT,
+    started_at TEXT,
+    completed_at TEXT,
+    duration REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_run ON jobs (run_id);
+
+CREATE TABLE IF NOT EXISTS steps (
+    job_id INTEGER NOT NULL REFERENCES jobs (id),
+    number INTEGER NOT NULL,
+    name TEXT,
+    status TEXT,
+    conclusion TEXT,
+    started_at TEXT,
+    completed_at TEXT,
+    duration REAL,
+    PRIMARY KEY (job_id, number)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# Incomplete runs at most this much older than the newest stored run are
+# picked up by refetching the listing; older ones (say a deployment waiting
+# for approval) are refreshed one by one instead
+REFETCH_WINDOW = timedelta(days=2)
+
+# Conclusions whose durations say nothing about build speed
+IGNORED_CONCLUSIONS = ("cancelled", "skipped")
+
+def open_history(path=HISTORY_DB):
+    """Open (creating if needed) the history database"""
+    db = sqlite3.connect(path)
+    db.execute("PRAGMA journal_mode = WAL")
+    upgrading = db.execute("SELECT 1 FROM sqlite_master WHERE name = 'runs'").fetchone() and \
+        not db.execute("SELECT 1 FROM sqlite_master WHERE name = 'meta'").fetchone()
+    db.executescript(SCHEMA)
+    if upgrading:
+        # Histories from before the mark was kept were complete up to their newest run
+        with db:
+            db.execute("INSERT INTO meta SELECT 'fetched_through', MAX(created_at) FROM runs "
+                       "WHERE EXISTS (SELECT 1 FROM runs)")
+    return db
+
+def timestamp(value):
+    """Format a datetime the way the API and the database store it"""
+    return value.astimezone(timezone.utc).strftime(TIME_FORMAT)
+
+def run_row(run):
+    """Return the runs table row for an API workflow run"""
+    duration = None
+    if run.get("status") == "completed":
+        duration = seconds_between(parse_time(run.get("run_started_at") or run.get("created_at")),
+                                   parse_time(run.get("updated_at")))
+    return (run["id"], workflow_file(run), run.get("name"), run.get("run_number"), run.get("head_branch"),
+            run.get("event"), run.get("status"), run.get("conclusion"), run["created_at"],
+            run.get("run_started_at"), run.get("updated_at"), duration, run.get("html_url"))
+
+def store_runs(db, runs):
+    """Insert or update workflow runs"""
+    db.executemany("""
+        INSERT INTO runs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (id) DO UPDATE SET
+            status = excluded.status, conclusion = excluded.conclusion, updated_at = excluded.updated_at,
+            run_started_at = excluded.run_started_at, duration = excluded.duration
+    """, [run_row(run) for run in runs])
+
+def store_jobs(db, jobs_by_run):
+    """Insert or update the jobs and steps of runs, given {run id: API jobs}"""
+    job_rows, step_rows = [], []
+    for run_id, jobs in jobs_by_run.items():
+        for job in jobs:
+            job_rows.append((job["id"], run_id, job.get("name"), job.get("status"), job.get("conclusion"),
+                             job.get("started_at"), job.get("completed_at"),
+                             seconds_between(parse_time(job.get("started_at")), parse_time(job.get("completed_at")))))
+            for number, step in enumerate(job.get("steps", []), 1):
+                step_rows.append((job["id"], step.get("number", number), step.get("name"), step.get("status"),
+                                  step.get("conclusion"), step.get("started_at"), step.get("completed_at"),
+                                  seconds_between(parse_time(step.get("started_at")),
+                                                  parse_time(step.get("completed_at")))))
+    db.executemany("INSERT OR REPLACE INTO jobs VALUES (?, ?, ?, ?, ?, ?, ?, ?)", job_rows)
+    db.executemany("INSERT OR REPLACE INTO steps VALUES (?, ?, ?, ?, ?, ?, ?, ?)", step_rows)
+
+def fetched_through(db):
+    """Return the created_at of the newest run of the last finished update, or None"""
+    row = db.execute("SELECT value FROM meta WHERE key = 'fetched_through'").fetchone()
+    return row[0] if row else None
+
+def high_water_mark(db):
+    """Return the created_at from which runs must be fetched again, or None for everything
+
+    That is the oldest run still incomplete when last fetched, since it
+    can still change, or else the newest run of the last finished update.
+    Incomplete runs older than REFETCH_WINDOW before that do not hold the
+    mark back.
+    """
+    newest = fetched_through(db)
+    if newest is None:
+        return None
+    window = timestamp(parse_time(newest) - REFETCH_WINDOW)
+    oldest_incomplete, = db.execute("SELECT MIN(created_at) FROM runs WHERE status != 'completed' "
+                                    "AND created_at >= ?", (window,)).fetchone()
+    return oldest_incomplete or newest
+
+def stale_runs(db, since):
+    """Return the IDs of runs created before since that were incomplete when last fetched"""
+    return [run_id for run_id, in db.execute(
+        "SELECT id FROM runs WHERE status != 'completed' AND created_at < ?", (since,))]
+
+def refresh_runs(client, run_ids):
+    """Fetch runs by ID; returns (runs, IDs of runs deleted on GitHub)"""
+    runs, deleted = [], []
+    for run_id in run_ids:
+        try:
+            runs.append(client.get_run(run_id))
+        except GitHubError as e:
+            if e.status != 404:
+                raise
+            deleted.append(run_id)
+    return runs, deleted
+
+def new_run_pages(client, since, limit=None):
+    """Yield pages of runs created at or after since (every run when since is None), newest first
+
+    limit only bounds a first backfill: an update after one fetches every
+    new run, since runs skipped then would never be fetched.
+    """
+    params = {"per_page": 100}
+    if since is not None:
+        params["created"] = f">={since}"
+        limit = None
+    fetched = 0
+    for page in client.pages("actions/runs", params):
+        runs = []
+        for run in page.get("workflow_runs", []):
+            if since is not None and run["created_at"] < since:
+                yield runs
+                return
+            runs.append(run)
+            fetched += 1
+            if limit is not None and fetched >= limit:
+                yield runs
+                return
+        yield runs
+
+def missing_jobs(db, runs):
+    """Return the completed runs among runs whose jobs are not stored yet"""
+    completed = [run for run in runs if run.get("status") == "completed"]
+    known = set()
+    for start in range(0, len(completed), 500):
+        chunk = [run["id"] for run in completed[start:start + 500]]
+        known.update(run_id for run_id, in db.execute(
+            f"SELECT DISTINCT run_id FROM jobs WHERE run_id IN ({','.join('?' * len(chunk))})", chunk))
+    return [run for run in completed if run["id"] not in known]
+
+def delete_runs(db, run_ids):
+    """Delete runs along with their jobs and steps"""
+    params = [(run_id,) for run_id in run_ids]
+    db.executemany("DELETE FROM steps WHERE job_id IN (SELECT id FROM jobs WHERE run_id = ?)", params)
+    db.executemany("DELETE FROM jobs WHERE run_id = ?", params)
+    db.executemany("DELETE FROM runs WHERE id = ?", params)
+
+def update_history(db, client, limit=None, workers=DEFAULT_WORKERS):
+    """Fetch runs newer than the high-water mark, plus jobs of newly completed runs
+
+    Each page of runs is committed with its jobs, so an update cut short
+    (say by the rate limit) keeps what it fetched and the next one does not
+    request those jobs again. The mark only moves once every page is in.
+    Runs left incomplete before the mark are fetched by ID; those deleted on
+    GitHub are dropped from the history.
+
+    Returns (runs stored, runs whose jobs were stored).
+    """
+    since = high_water_mark(db)
+    newest = fetched_through(db)
+    stored = with_jobs = 0
+    for runs in new_run_pages(client, since, limit):
+        jobs, _ = fetch_jobs(client, missing_jobs(db, runs), workers) if runs else ({}, 0)
+        with db:
+            store_runs(db, runs)
+            store_jobs(db, jobs)
+        if runs and (newest is None or runs[0]["created_at"] > newest):
+            newest = runs[0]["created_at"]
+        stored += len(runs)
+        with_jobs += len(jobs)
+
+    stale, deleted = refresh_runs(client, stale_runs(db, since)) if since else ([], [])
+    jobs, _ = fetch_jobs(client, missing_jobs(db, stale), workers) if stale else ({}, 0)
+    with db:
+        delete_runs(db, deleted)
+        store_runs(db, stale)
+        store_jobs(db, jobs)
+        if newest is not None:
+            db.execute("INSERT OR REPLACE INTO meta VALUES ('fetched_through', ?)", (newest,))
+    return stored + len(stale), with_jobs + len(jobs)
+
+def percentile(values, fraction):
+    """Return a percentile of sorted values, interpolating between neighbours"""
+    position = (len(values) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+def duration_percentiles(db, since, workflow=None, branch=None):
+    """Return {workflow: (runs, p50, p95, p99)} over completed runs created since"""
+    query = ["SELECT workflow, duration FROM runs WHERE created_at >= ? AND duration IS NOT NULL",
+             f"AND conclusion NOT IN ({','.join('?' * len(IGNORED_CONCLUSIONS))})"]
+    params = [since, *IGNORED_CONCLUSIONS]
+    if workflow:
+        query.append("AND workflow = ?")
+        params.append(workflow)
+    if branch:
+        query.append("AND branch = ?")
+        params.append(branch)
+    query.append("ORDER BY workflow, duration")
+
+    durations = {}
+    for name, duration in db.execute(" ".join(query), params):
+        durations.setdefault(name, []).append(duration)
+    return {name: (len(values), percentile(values, 0.5), percentile(values, 0.95), percentile(values, 0.99))
+            for name, values in durations.items()}
+
+def find_regressions(db, since, percentiles, threshold, recent=5, branch=None):
+    """Return (workflow, run number, duration, p50, url) for recent runs slower than p50 by more than threshold
+
+    Only each workflow's newest `recent` completed runs in the window are
+    checked, each workflow with one indexed lookup.
+    """
+    query = ["SELECT run_number, duration, html_url FROM runs WHERE workflow = ? AND created_at >= ?",
+             "AND duration IS NOT NULL",
+             f"AND conclusion NOT IN ({','.join('?' * len(IGNORED_CONCLUSIONS))})"]
+    if branch:
+        query.append("AND branch = ?")
+    query.append("ORDER BY created_at DESC LIMIT ?")
+
+    regressions = []
+    for workflow, (_, p50, _, _) in sorted(percentiles.items()):
+        params = [workflow, since, *IGNORED_CONCLUSIONS] + ([branch] if branch else []) + [recent]
+        for run_number, duration, url in db.execute(" ".join(query), params):
+            if p50 and duration > p50 * (1 + threshold):
+                regressions.append((workflow, run_number, duration, p50, url))
+    return regressions
+
+def report(db, days=30, threshold=0.2, recent=5, workflow=None, branch=None):
+    """Print duration percentiles per workflow and flag regressed runs; returns the regression count"""
+    since = timestamp(datetime.now(timezone.utc) - timedelta(days=days))
+    percentiles = duration_percentiles(db, since, workflow, branch)
+    if not percentiles:
+        print(f"No completed runs in the last {days} day(s) of history")
+        return 0
+
+    print(f"Build duration over the last {days} day(s):")
+    print(f"   {'Workflow':<44} {'Runs':>6} {'p50':>9} {'p95':>9} {'p99':>9}")
+    for name, (count, p50, p95, p99) in sorted(percentiles.items()):
+        print(f"   {name:<44} {count:>6} {format_duration(p50):>9} {format_duration(p95):>9} "
+              f"{format_duration(p99):>9}")
+    print()
+
+    regressions = find_regressions(db, since, percentiles, threshold, recent, branch)
+    for name, run_number, duration, p50, url in regressions:
+        print(f"REGRESSION: {name} #{run_number} took {format_duration(duration)}, "
+              f"{duration / p50 - 1:+.0%} over p50 {format_duration(p50)}")
+        print(f"   URL: {url}")
+    if not regressions:
+        print(f"No regressions beyond {threshold:.0%} over p50 in each workflow's newest {recent} run(s)")
+    return len(regressions)
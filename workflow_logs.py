@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Workflow Log Search
+Scans a run's downloaded logs archive for build, xcodebuild and codesign
+failures member by member and line by line, without unpacking it
+"""
+
+import io
+import posixpath
+import re
+import zipfile
+from collections import deque
+
+from instrumentation import count, span
+
+# Failure kinds in priority order: a line naming both a codesign problem
+# and "error:" is reported as codesign
+FAILURE_PATTERNS = (
+    ("xcodebuild", re.compile(r"\*\* (?:BUILD|TEST|ARCHIVE|ANALYZE) FAILED \*\*|xcodebuild: error"
+                              r"|The following build commands failed|Testing failed:")),
+    ("codesign", re.compile(r"Code ?Sign(?:ing)? (?:error|failed)|codesign\b.*(?:failed|error)"
+                            r"|No (?:signing certificate|profiles? for|provisioning profile)|errSecInternalComponent"
+                            r"|requires a provisioning profile|Provisioning profile \"[^\"]*\" (?:doesn't|does not|has expired)",
+                            re.IGNORECASE)),
+    ("error", re.compile(r"\berror:|##\[error\]", re.IGNORECASE)),
+)
+
+# Every pattern in one alternation, so most lines are searched only once
+FAILURE_PATTERN = re.compile("|".join(f"(?:{pattern.pattern})" for _, pattern in FAILURE_PATTERNS), re.IGNORECASE)
+
+# Rank of each failure kind; lower wins when a line matches several
+KIND_RANK = {kind: rank for rank, (kind, _) in enumerate(FAILURE_PATTERNS)}
+
+# Lines are read in pieces of at most this many characters, so one huge
+# line cannot exhaust memory
+MAX_LINE = 1 << 16
+
+# Characters at the end of a piece searched again with the next piece, so
+# matches spanning a piece boundary are still found
+OVERLAP = 1024
+
+# Characters of a matching or context line that are printed
+DISPLAY_WIDTH = 400
+
+def log_members(archive):
+    """Return the archive's log files, preferring per-step files over whole-job logs
+
+    The archive holds each job's full log at the top level (0_build.txt)
+    and the same lines split per step in a folder (build/1_Checkout.txt),
+    so top-level logs with a folder are skipped to avoid double matches.
+    """
+    infos = [info for info in archive.infolist() if not info.is_dir()]
+    folders = {info.filename.split("/", 1)[0] for info in infos if "/" in info.filename}
+    return [info for info in infos if "/" in info.filename
+            or re.sub(r'^\d+_', '', posixpath.splitext(info.filename)[0]) not in folders]
+
+def failure_kind(line):
+    """Return the highest priority failure kind a line matches"""
+    return next((kind for kind, pattern in FAILURE_PATTERNS if pattern.search(line)), None)
+
+def line_kind(line):
+    """Return a line's failure kind, or None, searching most lines only once"""
+    return failure_kind(line) if FAILURE_PATTERN.search(line) else None
+
+def scan_lines(lines, context=3):
+    """Yield (line number, line, kind) for matches and their context, grep -C style
+
+    lines holds (line, kind) pairs as read_lines yields them. kind is the
+    failure kind for matching lines and None for context lines;
+    (None, "--", None) separates groups that are not adjacent. Only context
+    lines before the next match are held in memory.
+    """
+    before = deque(maxlen=context)
+    after = 0
+    last = 0
+    for number, (line, kind) in enumerate(lines, 1):
+        line = line.rstrip("\r\n")
+        if kind:
+            if last and number - len(before) > last + 1:
+                yield None, "--", None
+            yield from ((before_number, before_line, None) for before_number, before_line in before)
+            before.clear()
+            yield number, line, kind
+            last, after = number, context
+        elif after:
+            yield number, line, None
+            last = number
+            after -= 1
+        else:
+            before.append((number, line))
+
+def read_lines(stream):
+    """Yield (line, kind) for every text line of a binary member stream
+
+    Lines are read in pieces of at most MAX_LINE characters. An overlong
+    line keeps only its first piece as text, but every piece is searched,
+    together with the last OVERLAP characters of the piece before it. kind
+    is the highest priority failure found in any piece.
+    """
+    text = io.TextIOWrapper(stream, encoding="utf-8", errors="replace", newline="")
+    head = kind = None
+    tail = ""
+    for piece in iter(lambda: text.readline(MAX_LINE), ""):
+        piece_kind = line_kind(tail + piece)
+        if head is None:
+            head, kind = piece, piece_kind
+        elif piece_kind and (kind is None or KIND_RANK[piece_kind] < KIND_RANK[kind]):
+            kind = piece_kind
+        if piece.endswith(("\n", "\r")):
+            yield head, kind
+            head = kind = None
+            tail = ""
+        else:
+            tail = piece[-OVERLAP:]
+    if head is not None:
+        yield head, kind
+
+def search_logs(path, context=3, max_matches=200):
+    """Scan every log in a logs archive; yields (member, line number, line, kind) like scan_lines
+
+    Stops after max_matches matching lines in total.
+    """
+    matches = 0
+    with zipfile.ZipFile(path) as archive:
+        for info in log_members(archive):
+            count("log bytes scanned", info.file_size)
+            with span("scan log", member=info.filename), archive.open(info) as stream:
+                for number, line, kind in scan_lines(read_lines(stream), context):
+                    yield info.filename, number, line, kind
+                    if kind is not None:
+                        count("log matches")
+                        matches += 1
+                        if matches >= max_matches:
+                            return
+
+def print_matches(results):
+    """Print search_logs results grouped by log file; returns the match counts per kind"""
+    counts = {}
+    member = None
+    for name, number, line, kind in results:
+        if name != member:
+            print(f"\n{name}:")
+            member = name
+        if number is None:
+            print("   --")
+            continue
+        marker = ">" if kind else " "
+        print(f"{marker}{number:>7}: {line[:DISPLAY_WIDTH]}")
+        if kind:
+            counts[kind] = counts.get(kind, 0) + 1
+    return counts
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Workflow Timing Analysis
+Fetches the jobs and steps of workflow runs concurrently and works out where
+their wall time goes, including each run's critical path
+"""
+
+import fnmatch
+import posixpath
+import statistics
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+# Workflow files analysed by default
+IOS_WORKFLOWS = "ios-*.yml"
+
+# Concurrent job list requests by default
+DEFAULT_WORKERS = 8
+
+# Slack allowed between one job finishing and a job that needs it starting
+CHAIN_TOLERANCE = 1.0
+
+# Timing of one job: seconds queued and running, and (name, seconds) per step
+JobTiming = namedtuple("JobTiming", "name started completed queued duration steps")
+
+def parse_time(timestamp):
+    """Parse an API timestamp, or return None when it is missing"""
+    if not timestamp:
+        return None
+    return datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+
+def seconds_between(start, end):
+    """Return the seconds from start to end, or None if either is missing"""
+    if start is None or end is None:
+        return None
+    return (end - start).total_seconds()
+
+def format_duration(seconds):
+    """Format seconds as 1h02m03s, 4m05s or 12s"""
+    if seconds is None:
+        return "-"
+    seconds = int(round(seconds))
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    if hours:
+        return f"{hours}h{minutes:02d}m{seconds:02d}s"
+    if minutes:
+        return f"{minutes}m{seconds:02d}s"
+    return f"{seconds}s"
+
+def workflow_file(run):
+    """Return the workflow file name a run came from, e.g. ios-build-optimized.yml"""
+    return posixpath.basename(run.get("path", "").split("@", 1)[0])
+
+def select_runs(runs, pattern=IOS_WORKFLOWS):
+    """Return the runs whose workflow file matches a glob pattern"""
+    return [run for run in runs if fnmatch.fnmatch(workflow_file(run), pattern)]
+
+def fetch_jobs(client, runs, workers=DEFAULT_WORKERS):
+    """Fetch every run's jobs over a bounded thread pool
+
+    Returns ({run id: jobs}, wall seconds). The requests overlap, so the
+    wall time tracks the slowest request rather than the sum of them all.
+    """
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(runs) or 1))) as pool:
+        jobs = dict(zip([run["id"] for run in runs], pool.map(client.list_jobs, [run["id"] for run in runs])))
+    return jobs, time.perf_counter() - start
+
+def job_timing(job):
+    """Return a JobTiming for one job from the jobs API"""
+    started, completed = parse_time(job.get("started_at")), parse_time(job.get("completed_at"))
+    steps = [(step.get("name", "Unknown"),
+              seconds_between(parse_time(step.get("started_at")), parse_time(step.get("completed_at"))))
+             for step in job.get("steps", [])]
+    return JobTiming(job.get("name", "Unknown"), started, completed,
+                     seconds_between(parse_time(job.get("created_at")), started),
+                     seconds_between(started, completed), steps)
+
+def critical_path(timings):
+    """Return the chain of jobs that bounded the run's wall time, first job first
+
+    The API does not expose `needs`, so the chain is rebuilt from
+    timestamps: starting at the job that finished last, each step back
+    takes the job that finished last before the current one started.
+    """
+    finished = [timing for timing in timings if timing.started and timing.completed]
+    if not finished:
+        return []
+    current = max(finished, key=lambda timing: timing.completed)
+    path = [current]
+    while True:
+        earlier = [timing for timing in finished if timing not in path
+                   and seconds_between(timing.completed, current.started) >= -CHAIN_TOLERANCE]
+        if not earlier:
+            break
+        current = max(earlier, key=lambda timing: timing.completed)
+        path.append(current)
+    return path[::-1]
+
+def run_wall_time(run, timings):
+    """Return seconds from the run being created to its last job finishing"""
+    ends = [timing.completed for timing in timings if timing.completed]
+    return seconds_between(parse_time(run.get("run_started_at") or run.get("created_at")), max(ends) if ends else None)
+
+def summarize(runs, jobs):
+    """Aggregate job and step durations per workflow across runs
+
+    Returns {workflow file: {"jobs": {job: [seconds]}, "steps": {(job, step): [seconds]}}}.
+    """
+    summary = {}
+    for run in runs:
+        workflow = summary.setdefault(workflow_file(run), {"jobs": {}, "steps": {}})
+        for timing in map(job_timing, jobs.get(run["id"], [])):
+            if timing.duration is not None:
+                workflow["jobs"].setdefault(timing.name, []).append(timing.duration)
+            for step, seconds in timing.steps:
+                if seconds is not None:
+                    workflow["steps"].setdefault((timing.name, step), []).append(seconds)
+    return summary
+
+def print_summary(summary, top_steps=10):
+    """Print mean and max duration per job and the slowest steps per workflow"""
+    for workflow, data in sorted(summary.items()):
+        print(f"{workflow}:")
+        for name, samples in sorted(data["jobs"].items(), key=lambda item: -statistics.mean(item[1])):
+            print(f"   Job {name}: mean {format_duration(statistics.mean(samples))}, "
+                  f"max {format_duration(max(samples))} over {len(samples)} run(s)")
+        slowest = sorted(data["steps"].items(), key=lambda item: -sum(item[1]))[:top_steps]
+        for (job, step), samples in slowest:
+            print(f"      {format_duration(statistics.mean(samples)):>8}  {job} / {step}")
+        print()
+
+def print_run_timings(run, jobs):
+    """Print one run's jobs with queue and run time, then its critical path"""
+    timings = [job_timing(job) for job in jobs]
+    print(f"{workflow_file(run)} #{run.get('run_number', run['id'])} ({run.get('conclusion') or run.get('status')}): "
+          f"wall {format_duration(run_wall_time(run, timings))}")
+    for timing in sorted(timings, key=lambda timing: (timing.started is None, timing.started and timing.started.timestamp())):
+        print(f"   {timing.name}: queued {format_duration(timing.queued)}, ran {format_duration(timing.duration)}")
+    path = critical_path(timings)
+    if path:
+        chain = " -> ".join(f"{timing.name} ({format_duration(timing.duration)})" for timing in path)
+        length = seconds_between(path[0].started, path[-1].completed)
+        print(f"   Critical path: {chain} = {format_duration(length)}")
+    print()